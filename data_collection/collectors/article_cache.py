@@ -0,0 +1,68 @@
+import os
+import threading
+from typing import Dict, Optional
+from utils.disk_cache import DiskCache
+
+
+class ArticleCache:
+    """Local copy of everything NewsCollector downloads, so that reruns skip the network.
+
+    Redirects are keyed by the Finnhub URL, pages and extracted texts by the resolved
+    article URL. Pages and texts share one cache bounded by ARTICLE_CACHE_MAX_MB.
+    """
+
+    def __init__(self, cache_dir: str = None):
+        cache_dir = cache_dir or os.getenv("CACHE_DIR", "cache")
+        max_bytes = int(float(os.getenv("ARTICLE_CACHE_MAX_MB", 512)) * 1024 * 1024)
+
+        self.redirects = DiskCache(os.path.join(cache_dir, "article_redirects.sqlite"))
+        self.articles = DiskCache(os.path.join(cache_dir, "articles.sqlite"), max_bytes=max_bytes)
+
+        # Lookups run in worker threads, the counters are updated under a lock
+        self.__counters = {kind: {"hits": 0, "misses": 0} for kind in ("redirect", "html", "text")}
+        self.__counters_lock = threading.Lock()
+
+    def get_redirect(self, url: str) -> Optional[str]:
+        value = self.redirects.get(url)
+        return self.__count("redirect", value.decode("utf-8") if value is not None else None)
+
+    def set_redirect(self, url: str, resolved_url: str):
+        self.redirects.set(url, resolved_url.encode("utf-8"))
+
+    def get_html(self, url: str) -> Optional[str]:
+        value = self.articles.get(f"html:{url}")
+        return self.__count("html", value.decode("utf-8") if value is not None else None)
+
+    def set_html(self, url: str, html: str):
+        self.articles.set(f"html:{url}", html.encode("utf-8"))
+
+    def get_text(self, url: str) -> Optional[str]:
+        """Extracted text of the page at url, an empty string when nothing could be extracted"""
+        value = self.articles.get(f"text:{url}")
+        return self.__count("text", value.decode("utf-8") if value is not None else None)
+
+    def set_text(self, url: str, text: Optional[str]):
+        self.articles.set(f"text:{url}", (text or "").encode("utf-8"))
+
+    def report(self) -> Dict:
+        """Hits and misses by kind, plus the size of the underlying caches"""
+        return {
+            **self.__counters,
+            "redirects": self.redirects.stats(),
+            "articles": self.articles.stats()
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.redirects.close()
+        self.articles.close()
+
+    def __count(self, kind, value):
+        with self.__counters_lock:
+            self.__counters[kind]["hits" if value is not None else "misses"] += 1
+        return value
@@ -0,0 +1,121 @@
+import os
+import asyncio
+import httpx
+from typing import Awaitable, Callable, Iterable, List, Optional
+from urllib.parse import urlparse
+from utils.logging_utils import get_logger
+from utils.rate_limiter import get_rate_limiter
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/115.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
+}
+
+
+class ArticleDownloader:
+    """Concurrent redirect resolution and page download over one pool of keep-alive connections.
+
+    Requests are bounded per host by NEWS_MAX_CONCURRENCY_PER_HOST and still go through the
+    shared per-host rate limiters, so concurrency only overlaps the network waits.
+    """
+
+    def __init__(self):
+        self.logger = get_logger(__name__)
+
+        self.max_per_host = int(os.getenv("NEWS_MAX_CONCURRENCY_PER_HOST", 4))
+        self.max_in_flight = int(os.getenv("NEWS_MAX_IN_FLIGHT", 8))
+        self.timeout = float(os.getenv("NEWS_DOWNLOAD_TIMEOUT", 10))
+
+        self.client = None
+        self.__host_semaphores = {}
+
+    async def __aenter__(self):
+        self.client = httpx.AsyncClient(
+            headers=HEADERS,
+            timeout=self.timeout,
+            limits=httpx.Limits(max_keepalive_connections=self.max_in_flight, max_connections=self.max_in_flight * 2)
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.client.aclose()
+
+    async def resolve_redirect(self, url: str) -> Optional[str]:
+        """Target of the redirect answered for url, None if url does not redirect"""
+        try:
+            response = await self.__request(url, follow_redirects=False)
+            if 300 <= response.status_code < 400:
+                return response.headers.get("Location")
+            return None
+
+        except httpx.HTTPError as e:
+            self.logger.warning(f"Error fetching URL {url}: {e}")
+            return None
+
+    async def fetch(self, url: str) -> Optional[str]:
+        """HTML of the page at url, None on errors or non-200 answers"""
+        try:
+            response = await self.__request(url, follow_redirects=True)
+            if response.status_code == 200:
+                return response.text
+
+            self.logger.warning(f"Downloading {url} returned status {response.status_code}")
+            return None
+
+        except httpx.HTTPError as e:
+            self.logger.warning(f"Error downloading {url}: {e}")
+            return None
+
+    async def collect(self, items: Iterable, max_results: int,
+                      handler: Callable[[object], Awaitable[Optional[object]]]) -> List:
+        """Run handler over items concurrently and stop as soon as max_results non-None results are ready.
+
+        Items are started in order with at most NEWS_MAX_IN_FLIGHT running at a time (and no more
+        than twice the results still missing, to limit wasted downloads); the ones still running
+        when enough results are collected are cancelled.
+        """
+        results = []
+        pending = set()
+        items = iter(items)
+        exhausted = False
+
+        while len(results) < max_results:
+            while not exhausted and len(pending) < min(self.max_in_flight, 2 * (max_results - len(results))):
+                item = next(items, None)
+                if item is None:
+                    exhausted = True
+                    break
+                pending.add(asyncio.create_task(handler(item)))
+
+            if not pending:
+                break
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                try:
+                    result = task.result()
+                except Exception as e:
+                    self.logger.error(f"Error while downloading an article: {e}")
+                    continue
+
+                if result is not None and len(results) < max_results:
+                    results.append(result)
+
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        return results
+
+    async def __request(self, url, follow_redirects):
+        host = urlparse(url).netloc
+        if host not in self.__host_semaphores:
+            self.__host_semaphores[host] = asyncio.Semaphore(self.max_per_host)
+
+        async with self.__host_semaphores[host]:
+            await get_rate_limiter(host).acquire_async()
+            return await self.client.get(url, follow_redirects=follow_redirects)
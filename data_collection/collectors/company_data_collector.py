@@ -1,22 +1,82 @@
+import os
 import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
 from database.repositories import CompanyRepository
 from utils.logging_utils import get_logger
+from utils.rate_limiter import get_rate_limiter, log_rate_limiter_stats, YFINANCE_HOST
+
+# Companies saved per bulk upsert while the fetches are running
+SAVE_CHUNK_SIZE = 200
 
 class CompanyDataCollector:
     def __init__(self):
         self.logger = get_logger(__name__)
 
+        self.workers = int(os.getenv("COMPANY_WORKERS", 4))
+        self.refresh_days = int(os.getenv("COMPANY_REFRESH_DAYS", 30))
+        self.rate_limiter = get_rate_limiter(YFINANCE_HOST)
+
     def collect(self):
         self.logger.info("Starting company data collection...")
 
         symbols = CompanyRepository.get_all_symbols()
+        stale_symbols = self.__get_stale_symbols(symbols)
+
+        self.logger.info(
+            f"Fetching {len(stale_symbols)} of {len(symbols)} companies "
+            f"(data older than {self.refresh_days} days) with {self.workers} workers"
+        )
+
+        companies = []
+        failed = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.__fetch_company, symbol): symbol for symbol in stale_symbols}
+
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    companies.append(future.result())
+                except Exception as e:
+                    failed += 1
+                    self.logger.error(f"Error fetching company data for {symbol}: {e}")
+                    continue
+
+                if len(companies) >= SAVE_CHUNK_SIZE:
+                    CompanyRepository.save_companies(companies)
+                    companies = []
+
+        if companies:
+            CompanyRepository.save_companies(companies)
+
+        if failed:
+            self.logger.warning(f"Could not fetch the data of {failed} companies")
+
+        log_rate_limiter_stats(self.logger)
+        self.logger.info("Company data succesfully collected")
+
+    def __get_stale_symbols(self, symbols):
+        """Symbols never fetched, or whose data is older than refresh_days"""
+        update_times = CompanyRepository.get_update_times(symbols)
+        threshold = datetime.now() - timedelta(days=self.refresh_days)
+
+        return [
+            symbol for symbol in symbols
+            if update_times.get(symbol) is None or update_times[symbol] < threshold
+        ]
 
-        for symbol in symbols:
-            self.logger.debug(f"Fetching {symbol} data...")
-            info = yf.Ticker(symbol).info
-            self.logger.debug(f"Fetched {symbol} data succesfully")
+    def __fetch_company(self, symbol):
+        self.logger.debug(f"Fetching {symbol} data...")
+        # The limiter is shared by all the workers, so the request rate stays a global limit
+        self.rate_limiter.acquire()
+        info = yf.Ticker(symbol).info
+        self.logger.debug(f"Fetched {symbol} data succesfully")
 
-            CompanyRepository.save_company(symbol, info.get('longName'), info.get('marketCap'), info.get('sector'))
-            self.logger.debug(f"Company {symbol} succesfully saved in the database")
-        
-        self.logger.info("Company data succesfully collected")
\ No newline at end of file
+        return {
+            "symbol": symbol,
+            "name": info.get("longName"),
+            "market_cap": info.get("marketCap"),
+            "sector": info.get("sector"),
+            "updated_at": datetime.now()
+        }
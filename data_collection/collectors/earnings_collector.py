@@ -1,57 +1,73 @@
 import os
-import time
+import asyncio
 import pandas as pd
 from io import StringIO
-from playwright.sync_api import sync_playwright
 from utils.logging_utils import get_logger
 from database.repositories import EarningsRepository
+from utils.rate_limiter import get_rate_limiter, log_rate_limiter_stats
 from playwright.sync_api import sync_playwright, TimeoutError
+from playwright.async_api import async_playwright, TimeoutError as AsyncTimeoutError
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/115.0.0.0 Safari/537.36"
+)
+
+COOKIE_BUTTON_SELECTOR = (
+    'button:has-text("Accept all"), button:has-text("Accept"),  button:has-text("Accetta tutto"), '
+    'button[name="agree"], button[id*="accept"]'
+)
+
+PAGE_SIZE = 100
 
 class EarningsCollector:
     def __init__(self):
         self.logger = get_logger(__name__)
 
+        # Overridable so that the collector can run against locally served fixtures
+        self.calendar_url = os.getenv("EARNINGS_CALENDAR_URL", "https://finance.yahoo.com/calendar/earnings")
+        self.workers = int(os.getenv("EARNINGS_SCRAPING_WORKERS", 1))
+        self.rate_limiter = get_rate_limiter(self.calendar_url)
+
     def collect(self):
         self.logger.info("Starting earnings collection...")
 
+        start_date = os.getenv("START_DATE")
+        end_date = os.getenv("END_DATE")
+        dates = [date.date() for date in pd.date_range(start=start_date, end=end_date)]
+
+        if self.workers > 1:
+            asyncio.run(self.__collect_concurrently(dates))
+        else:
+            self.__collect_serially(dates)
+
+        log_rate_limiter_stats(self.logger)
+        self.logger.info("Earnings succesfully collected")
+
+    def __collect_serially(self, dates):
         with sync_playwright() as p:
             browser = p.chromium.launch(headless=True)
-            context = browser.new_context(
-                user_agent=(
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/115.0.0.0 Safari/537.36"
-                )
-            )
+            context = browser.new_context(user_agent=USER_AGENT)
             page = context.new_page()
 
-            start_date = os.getenv("START_DATE")
-            end_date = os.getenv("END_DATE")
-
-            for date in pd.date_range(start=start_date, end=end_date):
-                date = date.date()
+            for date in dates:
                 self.logger.debug(f"Getting earnings for date {date}")
 
                 offset = 0
-                size = 100
+                size = PAGE_SIZE
 
                 while True:
-                    url = (
-                        f"https://finance.yahoo.com/calendar/earnings"
-                        f"?day={date}&offset={offset}&size={size}"
-                    )
+                    url = self.__build_url(date, offset, size)
                     self.logger.debug(f"URL used to fetch data: {url}")
 
                     try:
+                        self.rate_limiter.acquire()
                         page.goto(url, wait_until="domcontentloaded", timeout=10000)
 
                         # Handle cookie consent
                         try:
-                            accept_button = page.wait_for_selector(
-                                'button:has-text("Accept all"), button:has-text("Accept"),  button:has-text("Accetta tutto"), '
-                                'button[name="agree"], button[id*="accept"]',
-                                timeout=5000
-                            )
+                            accept_button = page.wait_for_selector(COOKIE_BUTTON_SELECTOR, timeout=5000)
                             if accept_button:
                                 accept_button.click()
                                 self.logger.debug("Accepted Yahoo cookies")
@@ -63,20 +79,13 @@ class EarningsCollector:
                         page.wait_for_selector("table", timeout=10000)
                         content = page.content()
 
-                        # Parse with pandas
-                        tables = pd.read_html(StringIO(content))
-                        if tables and not tables[0].empty:
-                            earnings = tables[0]
-                            processed_data = self.__save_earnings_data(earnings, date)
-
-                            # If less than requested size, no more pages
-                            if processed_data < size:
-                                break
-                            else:
-                                offset += size
-                                time.sleep(int(os.getenv("SCRAPING_DELAY")))
-                        else:
+                        processed_data = self.__process_page(content, date)
+
+                        # If less than requested size, no more pages
+                        if processed_data < size:
                             break
+                        else:
+                            offset += size
 
                     except TimeoutError:
                         self.logger.warning(f"No earnings found for date {date}")
@@ -85,12 +94,93 @@ class EarningsCollector:
                         self.logger.error(f"Error fetching data for {date} offset {offset}: {e}")
                         break
 
-                time.sleep(int(os.getenv("SCRAPING_DELAY")))
-
             browser.close()
-        
-        self.logger.info("Earnings succesfully collected")
-            
+
+    async def __collect_concurrently(self, dates):
+        """Spread the days over a pool of pages sharing one browser context"""
+        self.logger.info(f"Scraping {len(dates)} days with {self.workers} concurrent pages")
+
+        queue = asyncio.Queue()
+        for date in dates:
+            queue.put_nowait(date)
+
+        self.__cookies_accepted = False
+
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            context = await browser.new_context(user_agent=USER_AGENT)
+
+            await asyncio.gather(*[self.__earnings_worker(context, queue) for _ in range(self.workers)])
+
+            await browser.close()
+
+    async def __earnings_worker(self, context, queue):
+        page = await context.new_page()
+
+        while not queue.empty():
+            date = queue.get_nowait()
+            self.logger.debug(f"Getting earnings for date {date}")
+
+            # Pages of the same day are walked by the same worker
+            offset = 0
+            size = PAGE_SIZE
+
+            while True:
+                url = self.__build_url(date, offset, size)
+                self.logger.debug(f"URL used to fetch data: {url}")
+
+                try:
+                    # The limiter is shared by all the workers, so the request rate stays a global limit
+                    await self.rate_limiter.acquire_async()
+                    await page.goto(url, wait_until="domcontentloaded", timeout=10000)
+                    await self.__accept_cookies(page)
+
+                    # Wait for the earnings table to load
+                    await page.wait_for_selector("table", timeout=10000)
+                    content = await page.content()
+
+                    # Parsing and saving are blocking, keep them off the event loop
+                    processed_data = await asyncio.to_thread(self.__process_page, content, date)
+
+                    # If less than requested size, no more pages
+                    if processed_data < size:
+                        break
+                    offset += size
+
+                except AsyncTimeoutError:
+                    self.logger.warning(f"No earnings found for date {date}")
+                    break
+                except Exception as e:
+                    self.logger.error(f"Error fetching data for {date} offset {offset}: {e}")
+                    break
+
+        await page.close()
+
+    async def __accept_cookies(self, page):
+        # The consent is stored in the shared context, once accepted no page will show it again
+        if self.__cookies_accepted:
+            return
+
+        try:
+            accept_button = await page.wait_for_selector(COOKIE_BUTTON_SELECTOR, timeout=5000)
+            if accept_button:
+                await accept_button.click()
+                self.__cookies_accepted = True
+                self.logger.debug("Accepted Yahoo cookies")
+                await page.wait_for_timeout(2500)
+        except AsyncTimeoutError:
+            self.logger.debug("No cookie consent found or already accepted")
+
+    def __build_url(self, date, offset, size):
+        return f"{self.calendar_url}?day={date}&offset={offset}&size={size}"
+
+    def __process_page(self, content, date):
+        """Parse the earnings table of a calendar page and save it, returning the number of rows"""
+        tables = pd.read_html(StringIO(content))
+        if tables and not tables[0].empty:
+            return self.__save_earnings_data(tables[0], date)
+        return 0
+
     def __save_earnings_data(self, earnings, date):
         # Renaming columns
         earnings = earnings.rename(columns={
@@ -120,7 +210,7 @@ class EarningsCollector:
         self.logger.debug(f"Fetched {len(earnings)} earnings for date {date}")
 
         if not earnings.empty:
-            EarningsRepository.save_earnings_dates(earnings.to_dict(orient="records"))
+            EarningsRepository.save_earnings_dates(earnings)
             self.logger.debug(f"Earnings for date {date} succesfully saved in the database")
 
-        return len(earnings) if not earnings.empty else 0
\ No newline at end of file
+        return len(earnings) if not earnings.empty else 0
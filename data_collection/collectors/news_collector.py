@@ -1,151 +1,246 @@
 import os
-import time
-import pandas as pd
+import asyncio
 import finnhub
 import trafilatura
-import requests
 from datetime import datetime, timedelta
-from database.repositories import EarningsRepository, CompanyRepository, NewsRepository
+from database.repositories import EarningsRepository, NewsRepository
 from utils.logging_utils import get_logger
+from utils.rate_limiter import get_rate_limiter, log_rate_limiter_stats
+from utils.disk_cache import DiskCache
+from utils.article_utils import normalize_url
+from data_collection.collectors.article_downloader import ArticleDownloader
+from data_collection.collectors.article_cache import ArticleCache
+
+FINNHUB_HOST = "finnhub.io"
 
 class NewsCollector:
     def __init__(self):
         self.logger = get_logger(__name__)
 
+        self.finnhub_client = finnhub.Client(api_key=os.getenv("FINNHUB_API_KEY"))
+
+        self.cache_dir = os.getenv("CACHE_DIR", "cache")
+        self.finnhub_cache_ttl = float(os.getenv("FINNHUB_CACHE_TTL_HOURS", 168)) * 3600
+
+        self.duplicates_skipped = 0
+
     def collect(self):
+        # Caches are opened for the run only, so that their buffered access times are written when it ends.
+        # Finnhub answers per (symbol, from, to) serve reruns and repeated windows locally
+        with DiskCache(os.path.join(self.cache_dir, "finnhub.sqlite"), ttl=self.finnhub_cache_ttl) as self.finnhub_cache:
+            # Redirects, pages and extracted texts already downloaded by previous runs
+            with ArticleCache(self.cache_dir) as self.article_cache:
+                self.__collect()
+
+    def __collect(self):
         self.logger.info("Starting news collection...")
 
-        start_date = os.getenv("START_DATE")
-        end_date = os.getenv("END_DATE")
+        start_date = datetime.strptime(os.getenv("START_DATE"), "%Y-%m-%d").date()
+        end_date = datetime.strptime(os.getenv("END_DATE"), "%Y-%m-%d").date()
         
         max_news_0_1_days = int(os.getenv("MAX_NEWS_0_1_DAYS"))
         max_news_2_4_days = int(os.getenv("MAX_NEWS_2_4_DAYS"))
         max_news_5_7_days = int(os.getenv("MAX_NEWS_5_7_DAYS"))
 
-        for date in pd.date_range(start=start_date, end=end_date):
-            earnings = EarningsRepository.get_earnings_for_date(date.date())
-            
-            for earning in earnings:
-                company = CompanyRepository.get_company(earning["symbol"])
+        # All the earnings of the period with their company data, in a single query
+        earnings = EarningsRepository.get_earnings_with_companies(start_date, end_date)
+
+        asyncio.run(self.__collect_news(earnings, max_news_0_1_days, max_news_2_4_days, max_news_5_7_days))
+
+        log_rate_limiter_stats(self.logger)
+        self.logger.info(f"Finnhub response cache: {self.finnhub_cache.stats()}")
+        self.__log_article_cache_report()
+        self.logger.info(f"Skipped the download of {self.duplicates_skipped} articles already stored")
+        self.logger.info("News successfully collected")
+
+    async def __collect_news(self, earnings, max_news_0_1_days, max_news_2_4_days, max_news_5_7_days):
+        # One downloader, and so one connection pool, for the whole run
+        async with ArticleDownloader() as downloader:
+            self.downloader = downloader
+
+            for earning in earnings.to_dict(orient="records"):
+                company = {"symbol": earning["symbol"], "name": earning["name"]}
                 
                 self.logger.debug(f"{earning['date']} {earning['symbol']} {company['name']}")
                 
                 # Collect news for different periods
-                self.__collect_news_for_periods(earning, company, max_news_0_1_days, max_news_2_4_days, max_news_5_7_days)
-                
-                time.sleep(int(os.getenv("SCRAPING_DELAY")))
-
-        self.logger.info("News successfully collected")
+                await self.__collect_news_for_periods(earning, company, max_news_0_1_days, max_news_2_4_days, max_news_5_7_days)
 
-    def __collect_news_for_periods(self, earning, company, news_0_1, max_news_2_4, max_news_5_7):
+    async def __collect_news_for_periods(self, earning, company, news_0_1, max_news_2_4, max_news_5_7):
         """Collect news for different time periods before earnings"""
         earning_date = earning["date"]
-        
-        # Period 1: 0-1 days before (day before earnings)
-        start_date = earning_date - timedelta(days=1)
-        end_date = earning_date - timedelta(days=1)
-        self.__collect_news_for_period(earning["symbol"], start_date, end_date, news_0_1, "0-1 days")
-        
-        # Period 2: 2-4 days before
-        start_date = earning_date - timedelta(days=4)
-        end_date = earning_date - timedelta(days=2)
-        self.__collect_news_for_period(earning["symbol"], start_date, end_date, max_news_2_4, "2-4 days")
-        
-        # Period 3: 5-7 days before
-        start_date = earning_date - timedelta(days=7)
-        end_date = earning_date - timedelta(days=5)
-        self.__collect_news_for_period(earning["symbol"], start_date, end_date, max_news_5_7, "5-7 days")
+        symbol = earning["symbol"]
+
+        # A single request covers the three periods, which are then split locally
+        try:
+            articles = await self.__fetch_company_news(symbol, earning_date - timedelta(days=7), earning_date - timedelta(days=1))
+        except Exception as e:
+            self.logger.warning(f"Error while fetching news for {symbol} before {earning_date}: {e}")
+            return
 
-    def __collect_news_for_period(self, symbol, start_date, end_date, max_articles, period_name):
+        periods_articles = {"0-1 days": [], "2-4 days": [], "5-7 days": []}
+        for article in articles:
+            if article.get("source") != "Yahoo":
+                continue
+
+            days_before = (earning_date - datetime.fromtimestamp(article.get("datetime")).date()).days
+            if days_before == 1:
+                # Period 1: 0-1 days before (day before earnings)
+                periods_articles["0-1 days"].append(article)
+            elif 2 <= days_before <= 4:
+                # Period 2: 2-4 days before
+                periods_articles["2-4 days"].append(article)
+            elif 5 <= days_before <= 7:
+                # Period 3: 5-7 days before
+                periods_articles["5-7 days"].append(article)
+
+        await self.__collect_news_for_period(symbol, periods_articles["0-1 days"], news_0_1, "0-1 days")
+        await self.__collect_news_for_period(symbol, periods_articles["2-4 days"], max_news_2_4, "2-4 days")
+        await self.__collect_news_for_period(symbol, periods_articles["5-7 days"], max_news_5_7, "5-7 days")
+
+    async def __fetch_company_news(self, symbol, start_date, end_date):
+        """Finnhub company news for a date range, read from the response cache when available"""
+        start_date = start_date.strftime("%Y-%m-%d")
+        end_date = end_date.strftime("%Y-%m-%d")
+        cache_key = f"{symbol}:{start_date}:{end_date}"
+
+        # Cache reads and writes are SQLite round-trips, keep them off the event loop too
+        articles = await asyncio.to_thread(self.finnhub_cache.get_json, cache_key)
+        if articles is not None:
+            return articles
+
+        await get_rate_limiter(FINNHUB_HOST).acquire_async()
+        articles = await asyncio.to_thread(self.finnhub_client.company_news, symbol, _from=start_date, to=end_date)
+
+        await asyncio.to_thread(self.finnhub_cache.set_json, cache_key, articles)
+        return articles
+
+    async def __collect_news_for_period(self, symbol, yahoo_articles, max_articles, period_name):
         """Collect news for a specific period and save all articles at once"""
-        self.logger.debug(f"Collecting {max_articles} articles for {symbol} ({period_name}): {start_date} to {end_date}")
-        
-        finnhub_client = finnhub.Client(api_key=os.getenv("FINNHUB_API_KEY"))
-        articles_to_save = []  # List to collect articles for this period
+        self.logger.debug(f"Collecting {max_articles} articles for {symbol} ({period_name}) out of {len(yahoo_articles)}")
 
         try:
-            articles = finnhub_client.company_news(symbol, _from=start_date.strftime("%Y-%m-%d"), to=end_date.strftime("%Y-%m-%d"))
-            yahoo_articles = [a for a in articles if a.get("source") == "Yahoo"]
-            
-            article_index = 0
-            collected_count = 0
-            
-            while collected_count < max_articles and article_index < len(yahoo_articles):
-                article = yahoo_articles[article_index]
-                article_index += 1
-                
-                url = self.__get_redirect_url(article.get("url"))
-
-                try:
-                    downloaded = trafilatura.fetch_url(url)
-                    if downloaded:
-                        content = trafilatura.extract(downloaded)
-                        content = self.__remove_formatting(content)
-                    else:
-                        content = None
-
-                    if not content:
-                        self.logger.warning(f"Could not extract content from {url}")
-                        continue
-                    
-                    # Check if content is less than 1000 characters
-                    if len(content) < 1000:
-                        self.logger.debug(f"Article content too short ({len(content)} chars), skipping: {article.get('headline')}")
-                        continue
-
-                    date = datetime.fromtimestamp(article.get("datetime")).date()
-
-                    # Add article to the list instead of saving immediately
-                    article_data = {
-                        "symbol": symbol,
-                        "date": date,
-                        "headline": article.get("headline"),
-                        "content": content,
-                        "summary": article.get("summary"),
-                        "source": article.get("source"),
-                        "url": url,
-                        "sentiment_score": None,
-                        "sentiment_reasoning": None
-                    }
-                    articles_to_save.append(article_data)
-                    collected_count += 1
-
-                    self.logger.debug(f"Collected article: {article.get('headline')}")
-
-                except Exception as e:
-                    self.logger.error(f"Error extracting article from {url}: {e}")
+            # Articles are downloaded concurrently, stopping as soon as max_articles are valid
+            articles_to_save = await self.downloader.collect(
+                yahoo_articles, max_articles, lambda article: self.__download_article(article, symbol)
+            )
 
             # Save all articles for this period at once
-            self.__save_articles_batch(articles_to_save, symbol, period_name)
-            
-            time.sleep(int(os.getenv("SCRAPING_DELAY")))
+            await self.__save_articles_batch(articles_to_save, symbol, period_name)
 
         except Exception as e:
             self.logger.warning(f"Error while collecting {max_articles} articles for {symbol} ({period_name}): {e}")
 
-    def __save_articles_batch(self, articles, symbol, period_name):
+    async def __download_article(self, article, symbol):
+        """Resolve, download and extract one article, None if it is not usable"""
+        url = await self.__resolve_article_url(article.get("url"))
+        if not url:
+            self.logger.warning(f"Could not resolve the article URL {article.get('url')}")
+            return None
+
+        try:
+            # Articles already stored (for another symbol or window) are linked instead of downloaded again.
+            # Database round-trips are blocking, keep them off the event loop
+            normalized_url = normalize_url(url)
+            content_id = await asyncio.to_thread(NewsRepository.get_content_id_for_url, normalized_url)
+
+            if content_id is not None:
+                self.duplicates_skipped += 1
+                self.logger.debug(f"Article already stored, linking it: {article.get('headline')}")
+            else:
+                content = await self.__get_article_text(url)
+
+                if not content:
+                    self.logger.warning(f"Could not extract content from {url}")
+                    return None
+
+                # Check if content is less than 1000 characters
+                if len(content) < 1000:
+                    self.logger.debug(f"Article content too short ({len(content)} chars), skipping: {article.get('headline')}")
+                    return None
+
+                content_id = await asyncio.to_thread(NewsRepository.save_article_content, normalized_url, content)
+
+            date = datetime.fromtimestamp(article.get("datetime")).date()
+
+            self.logger.debug(f"Collected article: {article.get('headline')}")
+
+            return {
+                "symbol": symbol,
+                "date": date,
+                "headline": article.get("headline"),
+                "content": None,
+                "content_id": content_id,
+                "summary": article.get("summary"),
+                "source": article.get("source"),
+                "url": url,
+                "sentiment_score": None,
+                "sentiment_reasoning": None
+            }
+
+        except Exception as e:
+            self.logger.error(f"Error extracting article from {url}: {e}")
+            return None
+
+    async def __resolve_article_url(self, source_url):
+        """Resolved URL of a Finnhub article link, from the cache when already resolved"""
+        if not source_url:
+            return None
+
+        url = await asyncio.to_thread(self.article_cache.get_redirect, source_url)
+        if url is None:
+            url = await self.downloader.resolve_redirect(source_url)
+            # Failures are not cached, they are retried by the next run
+            if url:
+                await asyncio.to_thread(self.article_cache.set_redirect, source_url, url)
+
+        return url
+
+    async def __get_article_text(self, url):
+        """Extracted text of the article at url, using the cached text or page before downloading"""
+        content = await asyncio.to_thread(self.article_cache.get_text, url)
+        if content is not None:
+            return content or None
+
+        downloaded = await asyncio.to_thread(self.article_cache.get_html, url)
+        if downloaded is None:
+            downloaded = await self.downloader.fetch(url)
+            if not downloaded:
+                return None
+            await asyncio.to_thread(self.article_cache.set_html, url, downloaded)
+
+        # Extraction is CPU bound, keep it off the event loop
+        content = await asyncio.to_thread(trafilatura.extract, downloaded)
+        content = self.__remove_formatting(content) if content else None
+
+        # Pages without extractable text are cached too, as an empty text
+        await asyncio.to_thread(self.article_cache.set_text, url, content)
+        return content
+
+    def __log_article_cache_report(self):
+        report = self.article_cache.report()
+        for kind in ("redirect", "html", "text"):
+            hits, misses = report[kind]["hits"], report[kind]["misses"]
+            ratio = hits / (hits + misses) if hits + misses else 0
+            self.logger.info(f"Article cache {kind}: {hits} hits, {misses} misses ({ratio:.0%} hit rate)")
+
+        articles = report["articles"]
+        self.logger.info(
+            f"Article cache size: {articles['entries']} entries, {articles['bytes'] / 1024 / 1024:.1f} MB, "
+            f"{articles['evictions']} evicted"
+        )
+
+    async def __save_articles_batch(self, articles, symbol, period_name):
         """Save a batch of articles to database"""
         if not articles:
             self.logger.debug(f"No articles to save for {symbol} ({period_name})")
             return
         
         try:
-            NewsRepository.save_articles(articles)
+            await asyncio.to_thread(NewsRepository.save_articles, articles)
             self.logger.debug(f"Successfully saved {len(articles)} articles for {symbol} ({period_name})")
         except Exception as e:
             self.logger.error(f"Error saving articles for {symbol} ({period_name}): {e}")
 
     def __remove_formatting(self, text):
         return ' '.join(text.split())
-    
-    def __get_redirect_url(self, url):
-        try:
-            response = requests.get(url, allow_redirects=False, timeout=10)
-
-            if 300 <= response.status_code < 400:
-                return response.headers.get("Location")
-            return None
-        
-        except requests.RequestException as e:
-            print(f"Error fetching URL: {e}")
-            return None
\ No newline at end of file
@@ -1,15 +1,39 @@
 import os
+import math
+import pandas as pd
 import yfinance as yf
 from database.repositories import CompanyRepository
 from database.repositories import StockPriceRepository
+from database.price_cache import PriceCache
+from database.price_coverage import business_days, plan_requests, ranges_from_dates
 from utils.logging_utils import get_logger
+from utils.rate_limiter import get_rate_limiter, log_rate_limiter_stats, YFINANCE_HOST
 from datetime import timedelta
 from datetime import datetime
 
+PRICE_COLUMNS = {
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Volume": "volume"
+}
+
 class StockDataCollector:
     def __init__(self):
         self.logger = get_logger(__name__)
 
+        # Symbols per multi-ticker download, 1 keeps the one-symbol-per-call mode
+        self.batch_size = int(os.getenv("STOCK_BATCH_SIZE", 50))
+        self.rate_limiter = get_rate_limiter(YFINANCE_HOST)
+
+        # Incremental mode only downloads the ranges missing from the coverage index
+        self.incremental = os.getenv("STOCK_INCREMENTAL", "false").lower() == "true"
+        self.gap_merge_days = int(os.getenv("STOCK_GAP_MERGE_DAYS", 10))
+        self.max_holiday_gap = int(os.getenv("STOCK_MAX_HOLIDAY_GAP", 3))
+
+        self.download_calls = 0
+
     def collect(self):
         self.logger.info("Starting stock data collection...")
 
@@ -27,16 +51,158 @@ class StockDataCollector:
         extended_start = start_date - timedelta(days=data_fetch_padding_days)
         extended_end = end_date + timedelta(days=data_fetch_padding_days)
 
+        # Ranges are inclusive, while yfinance treats end as exclusive
+        last_date = extended_end - timedelta(days=1)
+
+        if self.incremental:
+            requests = self.__plan_incremental(symbols, extended_start, last_date)
+        else:
+            requests = {(extended_start, last_date): symbols}
+
+        # Bars of the current day can still change, so coverage stops at yesterday
+        covered_until = datetime.now().date() - timedelta(days=1)
+        coverage = []
+
+        for (range_start, range_end), range_symbols in requests.items():
+            if self.batch_size > 1:
+                collected = self.__collect_in_batches(range_symbols, range_start, range_end + timedelta(days=1))
+            else:
+                collected = [
+                    symbol for symbol in range_symbols
+                    if self.__collect_symbol(symbol, range_start, range_end + timedelta(days=1))
+                ]
+
+            if range_start <= covered_until:
+                coverage.extend((symbol, range_start, min(range_end, covered_until)) for symbol in collected)
 
-        for symbol in symbols:
-            self.logger.debug(f"Fetching {symbol} stock data for the period {start_date} - {end_date}...")
-            stock_data = yf.download(symbol, start=extended_start, end=extended_end, interval="1d", auto_adjust=True, progress=False)
-            self.logger.debug(f"Fetched {symbol} stock data succesfully")
+        if coverage:
+            StockPriceRepository.save_price_coverage(coverage)
 
-            self.__save_earnings_data(stock_data, symbol)
-            
+        self.__log_savings(symbols, requests, extended_start, last_date)
+
+        # Rewrite the columnar cache of the symbols whose prices changed
+        PriceCache().refresh(symbols)
+
+        log_rate_limiter_stats(self.logger)
         self.logger.info("Stock data succesfully collected")
         
+    def __collect_symbol(self, symbol, start_date, end_date):
+        """Download and save the prices of one symbol, True once the download went through even without prices"""
+        self.logger.debug(f"Fetching {symbol} stock data for the period {start_date} - {end_date}...")
+        self.rate_limiter.acquire()
+        stock_data = yf.download(symbol, start=start_date, end=end_date, interval="1d", auto_adjust=True, progress=False)
+        self.download_calls += 1
+        self.logger.debug(f"Fetched {symbol} stock data succesfully")
+
+        # A range without bars (new listing, suspension) is covered too, so that it is not requested again
+        if stock_data is None or stock_data.empty:
+            self.logger.warning(f"No stock data found for {symbol}")
+            return True
+
+        self.__save_earnings_data(stock_data, symbol)
+        return True
+
+    def __collect_in_batches(self, symbols, start_date, end_date):
+        """Download the symbols batch_size at a time with multi-ticker calls, retrying the failed ones one by one.
+
+        Returns the symbols whose download went through, with or without prices.
+        """
+        collected = []
+        failed = []
+
+        for offset in range(0, len(symbols), self.batch_size):
+            batch = symbols[offset:offset + self.batch_size]
+            self.logger.debug(f"Fetching stock data of {len(batch)} symbols for the period {start_date} - {end_date}...")
+
+            # yfinance sends one request per ticker of the batch, so one token each
+            self.rate_limiter.acquire(len(batch))
+            try:
+                stock_data = yf.download(
+                    batch, start=start_date, end=end_date, interval="1d", auto_adjust=True, progress=False, threads=True
+                )
+            except Exception as e:
+                # The whole batch goes to the one by one fallback
+                self.logger.warning(f"Batch download of {len(batch)} symbols failed: {e}")
+                failed.extend(symbol for symbol in batch if symbol not in failed)
+                continue
+            finally:
+                self.download_calls += 1
+
+            prices = self.__reshape_batch(stock_data)
+            if not prices.empty:
+                StockPriceRepository.save_stock_prices(prices)
+
+            # Tickers the batch call returned no rows for
+            returned = set(prices["symbol"])
+            collected.extend(symbol for symbol in batch if symbol.upper() in returned)
+            failed.extend(symbol for symbol in batch if symbol.upper() not in returned and symbol not in failed)
+
+            self.logger.debug(f"Saved {len(prices)} rows for a batch of {len(batch)} symbols")
+
+        if failed:
+            self.logger.info(f"Retrying {len(failed)} symbols individually")
+            for symbol in failed:
+                try:
+                    if self.__collect_symbol(symbol, start_date, end_date):
+                        collected.append(symbol)
+                except Exception as e:
+                    self.logger.error(f"Error fetching stock data for {symbol}: {e}")
+
+        return collected
+
+    def __plan_incremental(self, symbols, start_date, end_date):
+        """Missing ranges of every symbol, grouped into as few downloads as possible"""
+        symbols = list(dict.fromkeys(symbols))
+        coverage = StockPriceRepository.get_price_coverage(symbols)
+
+        # Symbols collected before the coverage index existed: derive it from their stored bars
+        unindexed = [symbol for symbol in symbols if symbol not in coverage]
+        if unindexed:
+            prices = StockPriceRepository.get_prices_for_symbols(unindexed)
+            derived = []
+            for symbol, dates in prices.groupby("symbol")["date"]:
+                for range_start, range_end in ranges_from_dates(dates, self.max_holiday_gap):
+                    derived.append((symbol, range_start, range_end))
+                    coverage.setdefault(symbol, []).append((range_start, range_end))
+
+            if derived:
+                StockPriceRepository.save_price_coverage(derived)
+                self.logger.info(f"Coverage index built from the stored prices of {len({d[0] for d in derived})} symbols")
+
+        return plan_requests(coverage, symbols, start_date, end_date, self.gap_merge_days)
+
+    def __log_savings(self, symbols, requests, start_date, end_date):
+        full_calls = self.__count_calls(len(symbols))
+        planned_calls = sum(self.__count_calls(len(group)) for group in requests.values())
+        full_rows = business_days([(start_date, end_date)]) * len(symbols)
+        fetched_rows = sum(business_days([date_range]) * len(group) for date_range, group in requests.items())
+
+        self.logger.info(
+            f"Stock download: {planned_calls} calls instead of {full_calls} for a full refetch "
+            f"({full_calls - planned_calls} saved, plus {self.download_calls - planned_calls} retries), "
+            f"~{fetched_rows} rows requested instead of ~{full_rows} ({full_rows - fetched_rows} saved)"
+        )
+
+    def __count_calls(self, symbols_count):
+        return math.ceil(symbols_count / self.batch_size) if self.batch_size > 1 else symbols_count
+
+    def __reshape_batch(self, stock_data):
+        """Turn the wide (Price, Ticker) columns of a multi-ticker download into one row per symbol and date"""
+        if stock_data is None or stock_data.empty:
+            return pd.DataFrame(columns=["symbol", "date"] + list(PRICE_COLUMNS.values()))
+
+        prices = stock_data.stack(level="Ticker", future_stack=True)
+        prices = prices[list(PRICE_COLUMNS)].rename(columns=PRICE_COLUMNS)
+
+        # Dates a ticker did not trade on come back as NaN rows
+        prices = prices.dropna(subset=["open", "high", "low", "close"])
+        prices["volume"] = prices["volume"].fillna(0).astype("int64")
+
+        prices = prices.rename_axis(["date", "symbol"]).reset_index()
+        prices["date"] = prices["date"].dt.date
+
+        return prices
+
     def __save_earnings_data(self, stock_data, symbol):
         # Removing multi-stock label
         stock_data.columns = stock_data.columns.droplevel(1)
@@ -61,7 +227,9 @@ class StockDataCollector:
         stock_data["symbol"] = symbol
 
         if not stock_data.empty:
-            StockPriceRepository.save_stock_prices(stock_data.to_dict(orient="records"))
+            StockPriceRepository.save_stock_prices(stock_data)
             self.logger.debug(f"Stock data {symbol} succesfully saved in the database")
+            return True
         else:
-            self.logger.warning(f"No stock data found for {symbol}")
\ No newline at end of file
+            self.logger.warning(f"No stock data found for {symbol}")
+            return False
\ No newline at end of file
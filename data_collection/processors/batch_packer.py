@@ -0,0 +1,49 @@
+import os
+from typing import Callable, Iterable, Iterator, List
+from utils.logging_utils import get_logger
+from utils.article_utils import estimate_tokens
+
+
+class BatchPacker:
+    """Split serialized batch requests into files that stay within the Batch API limits.
+
+    Requests are packed in order, a new batch being started as soon as the next request
+    would exceed the requests, bytes or estimated tokens allowed per batch.
+    """
+
+    def __init__(self, max_requests: int = None, max_bytes: int = None, max_tokens: int = None):
+        self.logger = get_logger(__name__)
+
+        self.max_requests = max_requests or int(os.getenv("BATCH_MAX_REQUESTS", 50000))
+        self.max_bytes = max_bytes or int(float(os.getenv("BATCH_MAX_MB", 190)) * 1024 * 1024)
+        self.max_tokens = max_tokens or int(os.getenv("BATCH_MAX_TOKENS", 20000000))
+
+    def pack(self, items: Iterable, to_line: Callable[[object], str] = None) -> Iterator[List]:
+        """Group JSONL lines (without the trailing newline) into batches, yielded as soon as they are full.
+
+        Items can also be arbitrary objects, with to_line returning their JSONL line.
+        """
+        current, current_bytes, current_tokens = [], 0, 0
+
+        for item in items:
+            line = to_line(item) if to_line else item
+            line_bytes = len(line.encode("utf-8")) + 1
+            line_tokens = estimate_tokens(line)
+
+            if line_bytes > self.max_bytes or line_tokens > self.max_tokens:
+                self.logger.warning(f"A request of {line_bytes} bytes exceeds the batch limits, it is sent alone")
+
+            if current and (
+                len(current) + 1 > self.max_requests
+                or current_bytes + line_bytes > self.max_bytes
+                or current_tokens + line_tokens > self.max_tokens
+            ):
+                yield current
+                current, current_bytes, current_tokens = [], 0, 0
+
+            current.append(item)
+            current_bytes += line_bytes
+            current_tokens += line_tokens
+
+        if current:
+            yield current
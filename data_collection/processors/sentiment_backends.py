@@ -0,0 +1,269 @@
+import os
+import json
+import random
+import asyncio
+import pandas as pd
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from openai import AsyncOpenAI, RateLimitError, APIConnectionError, InternalServerError
+from utils.logging_utils import get_logger
+from utils.article_utils import estimate_tokens
+
+# Source recorded with the scores of the OpenAI models, whichever endpoint produced them
+OPENAI_SOURCE = "openai"
+
+# Bump whenever the lexicon or the scoring formula change, so that cached scores are not reused
+LEXICON_VERSION = "1"
+
+# Articles scored by one worker process at a time
+LEXICON_CHUNK_SIZE = 2000
+
+# Added to the number of sentiment terms, so that a single term does not give an extreme score
+LEXICON_SMOOTHING = 2
+
+TOKEN_PATTERN = r"[a-z][a-z'\-]*"
+
+# Finance specific terms and their polarity, strongest signals weighted twice
+LEXICON = {
+    **dict.fromkeys([
+        "beat", "beats", "exceeded", "exceeds", "topped", "outperform", "outperformed", "upgrade", "upgraded",
+        "raised", "raises", "record", "surge", "surged", "soared", "soars", "breakthrough", "buyback", "bullish"
+    ], 2),
+    **dict.fromkeys([
+        "growth", "grew", "grow", "strong", "stronger", "strength", "rally", "rallied", "gain", "gains", "gained",
+        "profit", "profits", "profitable", "profitability", "optimistic", "upbeat", "robust", "momentum",
+        "expansion", "expand", "expands", "approval", "approved", "win", "wins", "won", "dividend", "accelerate",
+        "accelerating", "improved", "improvement", "improving", "rebound", "rebounded", "boost", "boosted",
+        "positive", "favorable", "jump", "jumped", "rose", "rise", "rising", "higher", "upside", "tailwind",
+        "tailwinds", "resilient", "success", "successful", "exceed", "innovative", "opportunity", "opportunities"
+    ], 1),
+    **dict.fromkeys([
+        "miss", "missed", "misses", "downgrade", "downgraded", "fraud", "bankruptcy", "plunge", "plunged",
+        "lawsuit", "investigation", "recall", "impairment", "writedown", "bearish", "crash", "default"
+    ], -2),
+    **dict.fromkeys([
+        "cut", "cuts", "lowered", "lower", "loss", "losses", "decline", "declined", "declining", "drop", "dropped",
+        "fell", "fall", "falling", "slump", "slumped", "weak", "weaker", "weakness", "pessimistic", "litigation",
+        "probe", "layoffs", "layoff", "restructuring", "shortfall", "headwind", "headwinds", "downside", "warning",
+        "warns", "warned", "disappointing", "disappointed", "disappoint", "concern", "concerns", "volatile",
+        "uncertainty", "uncertain", "delay", "delayed", "resign", "resigned", "resignation", "penalty", "fined",
+        "negative", "slowdown", "slowed", "selloff", "sell-off", "tumbled", "tumble", "sank", "deficit", "dilution",
+        "underperform", "underperformed", "risk", "risks"
+    ], -1),
+}
+
+# Words flipping the polarity of the term right after them
+NEGATIONS = {"not", "no", "never", "without", "didn't", "didnt", "doesn't", "doesnt", "isn't", "wasn't", "failed", "fails"}
+
+
+class SentimentBackend(ABC):
+    """A way of scoring articles directly, SentimentProcessor falling back to the OpenAI Batch API when none is set.
+
+    Scores from a provisional backend are replaced by the OpenAI models on their next run,
+    while other scores are never computed twice.
+    """
+
+    name = None
+    source = None
+    provisional = False
+
+    @abstractmethod
+    def cache_parts(self) -> List[str]:
+        """Everything besides the article that determines a score, part of the cache keys"""
+
+    @abstractmethod
+    def score(self, articles: List[Dict]) -> List[Dict]:
+        """Sentiment of the articles, as dicts with id, sentiment_score and sentiment_reasoning"""
+
+
+class LexiconSentimentBackend(SentimentBackend):
+    """Offline scorer counting finance lexicon terms, vectorized with pandas over chunks of articles in a process pool"""
+
+    name = "lexicon"
+    source = "lexicon"
+    provisional = True
+
+    def __init__(self, workers: int = None):
+        self.logger = get_logger(__name__)
+        self.workers = workers or int(os.getenv("SENTIMENT_WORKERS", os.cpu_count() or 1))
+
+    def cache_parts(self) -> List[str]:
+        return [self.name, LEXICON_VERSION]
+
+    def score(self, articles: List[Dict]) -> List[Dict]:
+        texts = [
+            (article["id"], " ".join(part for part in (article.get("headline"), article.get("summary"), article.get("content")) if part))
+            for article in articles
+        ]
+        chunks = [texts[i:i + LEXICON_CHUNK_SIZE] for i in range(0, len(texts), LEXICON_CHUNK_SIZE)]
+
+        # Starting processes is only worth it when there is more than one chunk
+        if len(chunks) > 1 and self.workers > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(chunks))) as executor:
+                scored = list(executor.map(_score_chunk, chunks))
+        else:
+            scored = [_score_chunk(chunk) for chunk in chunks]
+
+        results = [result for chunk in scored for result in chunk]
+        self.logger.info(f"Scored {len(results)} articles with the lexicon in {len(chunks)} chunks")
+        return results
+
+
+def _score_chunk(chunk):
+    """Score (id, text) pairs: (positive - negative) / (positive + negative + smoothing) over the lexicon terms"""
+    ids = [article_id for article_id, _ in chunk]
+
+    tokens = pd.Series([text for _, text in chunk], index=ids).str.lower().str.findall(TOKEN_PATTERN).explode().dropna()
+    negated = tokens.groupby(level=0).shift(1).isin(NEGATIONS)
+    weights = tokens.map(LEXICON)
+    weights = weights.where(~negated, -weights)
+
+    terms = pd.DataFrame({"token": tokens, "weight": weights}).dropna()
+    positive = terms["weight"].clip(lower=0).groupby(level=0).sum().reindex(ids, fill_value=0)
+    negative = (-terms["weight"]).clip(lower=0).groupby(level=0).sum().reindex(ids, fill_value=0)
+    scores = ((positive - negative) / (positive + negative + LEXICON_SMOOTHING)).round(2)
+
+    # Three strongest terms of each polarity, for the reasoning
+    strongest = terms.groupby([terms.index, "token"])["weight"].sum()
+    top_positive = strongest[strongest > 0].sort_values(ascending=False).groupby(level=0).head(3)
+    top_negative = strongest[strongest < 0].sort_values().groupby(level=0).head(3)
+    positive_terms = top_positive.reset_index(level=1)["token"].groupby(level=0).agg(", ".join)
+    negative_terms = top_negative.reset_index(level=1)["token"].groupby(level=0).agg(", ".join)
+
+    results = []
+    for article_id in ids:
+        if positive[article_id] == 0 and negative[article_id] == 0:
+            reasoning = "Lexicon score: no sentiment terms found."
+        else:
+            reasoning = (
+                f"Lexicon score: positive weight {positive[article_id]:g} ({positive_terms.get(article_id, 'none')}), "
+                f"negative weight {negative[article_id]:g} ({negative_terms.get(article_id, 'none')})."
+            )
+        results.append({"id": article_id, "sentiment_score": float(scores[article_id]), "sentiment_reasoning": reasoning})
+
+    return results
+
+
+class RealtimeSentimentBackend(SentimentBackend):
+    """OpenAI Responses API called concurrently for every article, for workloads that cannot wait for a batch.
+
+    Requests are the same as the batch ones, with max_output_tokens set to `output_tokens`. At most
+    `concurrency` are in flight, rate limited and transient failures are retried with exponential
+    backoff, and no new request is sent once the token budget is spent: the remaining articles stay
+    unscored for a later run.
+    """
+
+    name = "openai_realtime"
+    source = OPENAI_SOURCE
+
+    def __init__(self, build_body: Callable[[Dict], Dict], cache_parts: List[str], concurrency: int = None,
+                 max_retries: int = None, token_budget: int = None, output_tokens: int = None):
+        self.logger = get_logger(__name__)
+
+        self.build_body = build_body
+        self.parts = cache_parts
+        self.concurrency = concurrency or int(os.getenv("SENTIMENT_REALTIME_CONCURRENCY", 16))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("SENTIMENT_REALTIME_MAX_RETRIES", 5))
+
+        # Total tokens (input and output) this backend may use per run, 0 for no limit
+        self.token_budget = token_budget if token_budget is not None else int(os.getenv("SENTIMENT_REALTIME_TOKEN_BUDGET", 0))
+
+        # Output tokens, reasoning included, allowed per request and reserved in the budget while it is in flight
+        self.output_tokens = output_tokens or int(os.getenv("SENTIMENT_REALTIME_OUTPUT_TOKENS", 1024))
+
+        self.__usage = {"requests": 0, "retries": 0, "failed": 0, "skipped": 0, "input_tokens": 0, "output_tokens": 0}
+
+        # Tokens reserved by the requests in flight, counted against the budget until their usage is known
+        self.__reserved_tokens = 0
+
+    def cache_parts(self) -> List[str]:
+        return self.parts
+
+    def score(self, articles: List[Dict]) -> List[Dict]:
+        results = asyncio.run(self.__score_all(articles))
+
+        self.logger.info(
+            f"Realtime sentiment: {self.__usage['requests']} requests, {self.__usage['retries']} retries, "
+            f"{self.__usage['failed']} failed, {self.__usage['skipped']} skipped over budget, "
+            f"{self.__usage['input_tokens']} input and {self.__usage['output_tokens']} output tokens"
+        )
+        return [result for result in results if result is not None]
+
+    def usage(self) -> Dict:
+        return dict(self.__usage)
+
+    async def __score_all(self, articles):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        # Retries are handled here so that they are counted and bounded per request
+        async with AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0) as client:
+            return await asyncio.gather(*[self.__score_one(client, semaphore, article) for article in articles])
+
+    async def __score_one(self, client, semaphore, article):
+        async with semaphore:
+            body = {**self.build_body(article), "max_output_tokens": self.output_tokens}
+            estimate = estimate_tokens(json.dumps(body["input"])) + self.output_tokens
+
+            used = self.__usage["input_tokens"] + self.__usage["output_tokens"] + self.__reserved_tokens
+            if self.token_budget and used + estimate > self.token_budget:
+                self.__usage["skipped"] += 1
+                return None
+
+            self.__reserved_tokens += estimate
+            try:
+                return await self.__send(client, body, article)
+            finally:
+                self.__reserved_tokens -= estimate
+
+    async def __send(self, client, body, article):
+        """One request, retried on rate limits and transient errors"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await client.responses.create(**body)
+                break
+            except (RateLimitError, APIConnectionError, InternalServerError) as e:
+                if attempt == self.max_retries:
+                    self.logger.error(f"Realtime request failed for article {article['id']}: {e}")
+                    self.__usage["failed"] += 1
+                    return None
+
+                self.__usage["retries"] += 1
+                await asyncio.sleep(self.__retry_delay(e, attempt))
+            except Exception as e:
+                self.logger.error(f"Realtime request failed for article {article['id']}: {e}")
+                self.__usage["failed"] += 1
+                return None
+
+        self.__usage["requests"] += 1
+        if response.usage:
+            self.__usage["input_tokens"] += response.usage.input_tokens or 0
+            self.__usage["output_tokens"] += response.usage.output_tokens or 0
+
+        try:
+            parsed = json.loads(response.output_text)
+            return {
+                "id": article["id"],
+                "sentiment_score": parsed["sentiment_score"],
+                "sentiment_reasoning": parsed["reasoning_process"]
+            }
+        except Exception as e:
+            self.logger.error(f"Error parsing realtime result for article {article['id']}: {e}")
+            self.__usage["failed"] += 1
+            return None
+
+    def __retry_delay(self, error, attempt):
+        """The delay asked by a 429 response if any, otherwise exponential backoff with jitter"""
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+
+        try:
+            return float(retry_after)
+        except (TypeError, ValueError):
+            return min(2 ** attempt, 60) * (0.5 + random.random() / 2)
+
+
+# Backends selectable with SENTIMENT_BACKEND besides the OpenAI ones, which SentimentProcessor builds itself
+SENTIMENT_BACKENDS = {LexiconSentimentBackend.name: LexiconSentimentBackend}
+
+PROVISIONAL_SOURCES = {backend.source for backend in SENTIMENT_BACKENDS.values() if backend.provisional}
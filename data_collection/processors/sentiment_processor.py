@@ -1,14 +1,86 @@
 import os
 import json
 import time
+import asyncio
+import hashlib
+import threading
 import pandas as pd
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI, APIConnectionError, RateLimitError, InternalServerError
 from utils.logging_utils import get_logger
+from utils.disk_cache import DiskCache
+from utils.article_utils import company_terms, truncate_article
+from data_collection.processors.batch_packer import BatchPacker
+from data_collection.processors.sentiment_backends import SENTIMENT_BACKENDS, PROVISIONAL_SOURCES, OPENAI_SOURCE
+from data_collection.processors.sentiment_backends import RealtimeSentimentBackend
 from database.repositories import NewsRepository
 from database.repositories import CompanyRepository
+from database.repositories import SentimentBatchRepository
 from datetime import timedelta
 from datetime import datetime
 
+# Bump whenever the instructions or the response schema change, so that cached scores are not reused
+PROMPT_VERSION = "2"
+
+# Shared prefix of every request, the article specific part follows in a separate message
+SENTIMENT_INSTRUCTIONS = """You are a Financial Sentiment Analysis Expert specializing in stock market sentiment evaluation.
+Analyze the provided company news and predict the likely impact on the company’s stock performance after earnings reports.
+
+The article text may contain information about other companies. Only consider the symbol and company named in the request when forming your analysis.
+The article was automatically scraped from the web, so it may include irrelevant or unrelated information — ignore anything that does not pertain to that company.
+Long articles are shortened to their opening and to the passages mentioning the company.
+
+Output Requirements:
+Return ONLY a JSON object with exactly these fields:
+
+- "reasoning_process": Brief explanation (1–2 sentences) of your analysis.
+- "sentiment_score": A number between -1 (extremely bad choice) and 1 (must buy right now), with 0 being neutral.
+- The sentiment_score MUST be a numeric value (e.g., 0.75, -0.4, 0), not text, not words, and without any extra symbols or formatting.
+
+Example Outputs:
+{
+"reasoning_process": "Company reported strong revenue growth and raised guidance, indicating positive market momentum.",
+"sentiment_score": 0.85
+}
+{
+"reasoning_process": "CEO resignation amid fraud investigation is likely to damage investor confidence.",
+"sentiment_score": -0.9
+}
+{
+"reasoning_process": "Earnings met expectations but guidance was conservative due to market uncertainties, though the product pipeline remains strong.",
+"sentiment_score": 0.1
+}"""
+
+SENTIMENT_FORMAT = {
+    "type": "json_schema",
+    "name": "sentiment_analysis",
+    "schema": {
+        "type": "object",
+        "properties": {
+            "reasoning_process": {"type": "string"},
+            "sentiment_score": {"type": "number", "minimum": -1, "maximum": 1}
+        },
+        "required": ["reasoning_process", "sentiment_score"],
+        "additionalProperties": False
+    },
+    "strict": True
+}
+
+# Default backend, the OpenAI Batch API driven by this class
+BATCH_BACKEND = "openai_batch"
+
+# Same requests sent one by one to the Responses API, or the choice between both left to the workload
+REALTIME_BACKEND = "openai_realtime"
+AUTO_BACKEND = "auto"
+
+# Completion window of the batches, the longest a batch may take
+BATCH_COMPLETION_HOURS = 24
+
+# Results parsed before their sentiments are written to the database and the cache
+RESULTS_FLUSH_SIZE = 5000
+
+# Bytes read at a time when downloading a batch output file
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 class SentimentProcessor:
     def __init__(self):
@@ -24,7 +96,51 @@ class SentimentProcessor:
         os.makedirs(self.input_dir, exist_ok=True)
         os.makedirs(self.output_dir, exist_ok=True)
 
+        # Scores of every (model, prompt, symbol, content) already analysed, opened for each run
+        self.sentiment_cache_path = os.path.join(os.getenv("CACHE_DIR", "cache"), "sentiment.sqlite")
+
+        self.packer = BatchPacker()
+
+        # Another backend can score articles directly instead of the OpenAI Batch API
+        self.backend_name = os.getenv("SENTIMENT_BACKEND", BATCH_BACKEND)
+        self.backend = SENTIMENT_BACKENDS[self.backend_name]() if self.backend_name in SENTIMENT_BACKENDS else None
+        self.source = self.backend.source if self.backend else OPENAI_SOURCE
+
+        # In auto mode, small workloads and those needed before a batch could complete are sent in real time
+        self.realtime_max_articles = int(os.getenv("SENTIMENT_REALTIME_MAX_ARTICLES", 500))
+        deadline_hours = os.getenv("SENTIMENT_DEADLINE_HOURS")
+        self.deadline_hours = float(deadline_hours) if deadline_hours else None
+
+        # Article bodies above this estimated size are shortened before being sent
+        self.max_article_tokens = int(os.getenv("SENTIMENT_MAX_ARTICLE_TOKENS", 1500))
+
+        # Reattach to the batches a previous run left open instead of submitting their articles again
+        self.resume = os.getenv("SENTIMENT_RESUME", "true").lower() == "true"
+
+        # Bounds of the adaptive interval between two status checks of the same batch
+        self.poll_min_interval = float(os.getenv("BATCH_POLL_MIN_SECONDS", 10))
+        self.poll_max_interval = float(os.getenv("BATCH_POLL_MAX_SECONDS", 300))
+
+        # Cache key of every submitted article, and the ids of all the articles sharing it
+        self.__article_keys = {}
+        self.__articles_by_key = {}
+        self.__company_names = {}
+        self.__cache_parts = self.backend.cache_parts() if self.backend else [
+            self.model or "", PROMPT_VERSION, str(self.max_article_tokens)
+        ]
+        self.__stats = {"already_scored": 0, "cache_hits": 0, "duplicates": 0, "in_flight": 0, "submitted": 0, "scored": 0}
+        # Results of different batches are saved from concurrent threads
+        self.__stats_lock = threading.Lock()
+
+        # Seconds spent in every stage of the last run, download and apply summed over the batches
+        self.timings = {}
+
     def process(self):
+        # Closing the cache at the end of the run writes its buffered access times
+        with DiskCache(self.sentiment_cache_path) as self.sentiment_cache:
+            self.__process()
+
+    def __process(self):
         self.logger.info("Starting news batch sentiment processing...")
 
         start_date = os.getenv("START_DATE")
@@ -42,9 +158,26 @@ class SentimentProcessor:
         target_dates = pd.date_range(start=extended_start, end=extended_end).date
         #target_dates = [datetime.strptime(date_str, "%Y-%m-%d").date() for date_str in ["2025-04-01", "2025-04-02", "2025-04-03"]]
         
-        batch_ids = {}
+        self.timings = {}
+        stage_start = time.perf_counter()
+
+        # Batches left open stay in the manifest for the next run using the Batch API
+        batch_possible = self.backend_name in (BATCH_BACKEND, AUTO_BACKEND)
+        open_batches = SentimentBatchRepository.get_open_batches() if self.resume and batch_possible else []
+        in_flight = {
+            article_id
+            for batch in open_batches
+            for submitted_id, entry in batch["articles"].items()
+            for article_id in [submitted_id] + entry["duplicates"]
+        }
+        if open_batches:
+            self.logger.info(f"Resuming {len(open_batches)} batches left open by a previous run")
+
+        # Company names are needed by every request, load them once
+        self.__company_names = CompanyRepository.get_company_names()
+
+        pending_articles = []
 
-        # Create and submit one batch per day
         for date in target_dates:
             self.logger.debug(f"Fetching news from {date}")
             articles = NewsRepository.get_articles_for_date(date)
@@ -53,106 +186,229 @@ class SentimentProcessor:
                 self.logger.debug(f"No articles found for {date}, skipping.")
                 continue
 
+            # Only articles never analysed before, and not waiting in an open batch, are sent to the API
+            pending_articles.extend(self.__filter_scored(articles, in_flight))
+
+        self.timings["select"] = time.perf_counter() - stage_start
+        backend = self.backend or self.__choose_openai_backend(len(pending_articles), open_batches)
+
+        if backend is not None:
+            stage_start = time.perf_counter()
+            self.__score_directly(backend, pending_articles)
+            self.timings["score"] = time.perf_counter() - stage_start
+            if open_batches:
+                self.__check_open_batches(open_batches)
+        else:
+            self.__run_batches(pending_articles, open_batches, f"{extended_start}_{extended_end}")
+
+        self.logger.info(
+            f"Sentiment ({self.backend_name}): {self.__stats['submitted']} articles submitted, {self.__stats['scored']} scores written, "
+            f"{self.__stats['already_scored']} already scored, "
+            f"{self.__stats['cache_hits']} from the cache, {self.__stats['duplicates']} duplicates of submitted articles, "
+            f"{self.__stats['in_flight']} waiting in open batches"
+        )
+        self.logger.info("Sentiment stage timings: " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in self.timings.items()))
+        self.logger.info("News batches successfully processed.")
+
+    def __run_batches(self, pending_articles, open_batches, range_name):
+        """Send the pending articles through the OpenAI Batch API and apply the results of every open batch"""
+        stage_start = time.perf_counter()
+
+        # Requests of the whole range are packed into as few batches as the limits allow
+        requests = ((article, json.dumps(self.__build_request(article))) for article in pending_articles)
+        run_stamp = datetime.now().strftime("%Y%m%d%H%M%S")
+
+        for index, items in enumerate(self.packer.pack(requests, to_line=lambda item: item[1]), start=1):
             # Save files in dedicated folders
-            jsonl_filename = os.path.join(self.input_dir, f"batchinput_{date}.jsonl")
-            output_filename = os.path.join(self.output_dir, f"batchoutput_{date}.jsonl")
+            name = f"{range_name}_{run_stamp}_{index}"
+            jsonl_filename = os.path.join(self.input_dir, f"batchinput_{name}.jsonl")
+            output_filename = os.path.join(self.output_dir, f"batchoutput_{name}.jsonl")
+
+            self.__create_jsonl_file([line for _, line in items], jsonl_filename)
+
+            articles = {}
+            for article, _ in items:
+                key = self.__article_keys[article["id"]]
+                articles[article["id"]] = {"key": key, "duplicates": self.__articles_by_key[key][1:]}
+
+            manifest_id = SentimentBatchRepository.create_batch(jsonl_filename, output_filename, articles)
+            open_batches.append({
+                "id": manifest_id,
+                "input_file": jsonl_filename,
+                "output_file": output_filename,
+                "articles": articles,
+                "input_file_id": None,
+                "batch_id": None,
+                "output_file_id": None,
+                "status": "prepared"
+            })
+
+        self.timings["prepare"] = time.perf_counter() - stage_start
+        stage_start = time.perf_counter()
+
+        # Upload and create the new batches, and the ones a previous run could not submit
+        for batch in open_batches:
+            if batch["batch_id"] is None:
+                self.__submit_batch(batch)
+
+        self.timings["submit"] = time.perf_counter() - stage_start
+        self.timings["download"] = self.timings["apply"] = 0
+        stage_start = time.perf_counter()
+
+        # Every batch is followed on its own and applied as soon as it completes
+        asyncio.run(self.__follow_batches(open_batches))
+        self.timings["follow"] = time.perf_counter() - stage_start
+
+    def __check_open_batches(self, open_batches):
+        """Submit the open batches never sent, then check each one once and apply those already completed"""
+        for batch in open_batches:
+            if batch["batch_id"] is None:
+                self.__submit_batch(batch)
+
+        self.timings["download"] = self.timings["apply"] = 0
+        stage_start = time.perf_counter()
+
+        # A realtime run must not wait for batches, the ones still running are checked again by the next run
+        asyncio.run(self.__follow_batches(open_batches, wait=False))
+        self.timings["follow"] = time.perf_counter() - stage_start
+
+        pending = sum(1 for batch in open_batches if batch["status"] not in ["completed"] + SentimentBatchRepository.FAILED_STATUSES)
+        if pending:
+            self.logger.info(f"{pending} open batches are still running, they are checked again by the next run")
+
+    def __choose_openai_backend(self, pending_count, open_batches):
+        """The realtime backend when requested or when auto mode finds it faster, None for the Batch API"""
+        if self.backend_name == BATCH_BACKEND:
+            return None
+
+        if self.backend_name == AUTO_BACKEND:
+            urgent = self.deadline_hours is not None and self.deadline_hours < BATCH_COMPLETION_HOURS
+            large = pending_count > self.realtime_max_articles
+
+            # With nothing new to send, the open batches still have to be followed
+            if not urgent and (large or (pending_count == 0 and open_batches)):
+                self.logger.info(f"Using the Batch API for {pending_count} articles")
+                return None
+
+            self.logger.info(f"Using the realtime Responses API for {pending_count} articles")
+
+        return RealtimeSentimentBackend(
+            build_body=lambda article: self.__build_request(article)["body"], cache_parts=self.__cache_parts
+        )
 
-            self.__create_jsonl_file(articles, jsonl_filename)
-            file_id = self.__upload_file(jsonl_filename)
-            batch_id = self.__create_batch(file_id, f"Sentiment analysis for {date}")
+    def __score_directly(self, backend, articles):
+        """Score the pending articles with a backend other than the Batch API and save them like batch results"""
+        if not articles:
+            return
 
-            batch_ids[batch_id] = output_filename
+        updates = []
+        cache_entries = {}
+        results = backend.score(articles)
 
-            self.logger.info(f"Submitted batch for {date} with ID {batch_id}")
+        if len(results) < len(articles):
+            self.logger.warning(f"{len(articles) - len(results)} articles were not scored, they are sent again on the next run")
 
-        # Wait for all batches to complete
-        results = self.__wait_for_all_batches(list(batch_ids.keys()), 300)
+        for result in results:
+            key = self.__article_keys[result["id"]]
+            score = {"sentiment_score": result["sentiment_score"], "sentiment_reasoning": result["sentiment_reasoning"]}
 
-        # Download, process, and clean up
-        for batch_id, output_file_id in results.items():
-            output_filename = batch_ids[batch_id]
+            for article_id in self.__articles_by_key[key]:
+                updates.append({"id": article_id, **score, "sentiment_source": self.source})
+            cache_entries[key] = score
 
-            if output_file_id:
-                self.__download_results(output_file_id, output_filename)
-                self.__process_results(output_filename)
+            if len(updates) >= RESULTS_FLUSH_SIZE:
+                self.__save_results(updates, cache_entries)
+                updates, cache_entries = [], {}
 
-        self.logger.info("News batches successfully processed.")
+        self.__save_results(updates, cache_entries)
 
-    def __build_prompt(self, article_content, symbol, company):
-        return f"""
-            You are a Financial Sentiment Analysis Expert specializing in stock market sentiment evaluation.
-            Analyze the provided company news and predict the likely impact on the company’s stock performance after earnings reports.
-
-            The article text may contain information about other companies. Only consider the symbol {symbol} of the company {company} when forming your analysis.
-            The article was automatically scraped from the web, so it may include irrelevant or unrelated information — ignore anything that does not pertain to {company}.
-
-            Output Requirements:
-            Return ONLY a JSON object with exactly these fields:
-
-            - "reasoning_process": Brief explanation (1–2 sentences) of your analysis.
-            - "sentiment_score": A number between -1 (extremely bad choice) and 1 (must buy right now), with 0 being neutral.
-            - The sentiment_score MUST be a numeric value (e.g., 0.75, -0.4, 0), not text, not words, and without any extra symbols or formatting.
-
-            Example Outputs:
-            {{
-            "reasoning_process": "Company reported strong revenue growth and raised guidance, indicating positive market momentum.",
-            "sentiment_score": 0.85
-            }}
-            {{
-            "reasoning_process": "CEO resignation amid fraud investigation is likely to damage investor confidence.",
-            "sentiment_score": -0.9
-            }}
-            {{
-            "reasoning_process": "Earnings met expectations but guidance was conservative due to market uncertainties, though the product pipeline remains strong.",
-            "sentiment_score": 0.1
-            }}
-
-            Article:
-            {article_content}
-            """
-
-    def __create_jsonl_file(self, articles, filename):
+    def __cache_key(self, article):
+        parts = self.__cache_parts + [article["symbol"], article["content"] or ""]
+        return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+    def __filter_scored(self, articles, in_flight):
+        """Apply the cached scores and return the articles that still need to be submitted"""
+        pending = []
+        cached_updates = []
+
+        for article in articles:
+            # Provisional scores (e.g. from the lexicon) are replaced once a better backend runs
+            if article["sentiment_score"] is not None and (
+                article["sentiment_source"] not in PROVISIONAL_SOURCES or self.source in PROVISIONAL_SOURCES
+            ):
+                self.__stats["already_scored"] += 1
+                continue
+
+            if article["id"] in in_flight:
+                self.__stats["in_flight"] += 1
+                continue
+
+            key = self.__cache_key(article)
+
+            cached = self.sentiment_cache.get_json(key)
+            if cached is not None:
+                cached_updates.append({"id": article["id"], **cached, "sentiment_source": self.source})
+                self.__stats["cache_hits"] += 1
+                continue
+
+            # Same text for the same symbol already submitted: its result will be copied
+            if key in self.__articles_by_key:
+                self.__articles_by_key[key].append(article["id"])
+                self.__stats["duplicates"] += 1
+                continue
+
+            self.__article_keys[article["id"]] = key
+            self.__articles_by_key[key] = [article["id"]]
+            self.__stats["submitted"] += 1
+            pending.append(article)
+
+        if cached_updates:
+            NewsRepository.update_articles_sentiment(cached_updates)
+
+        return pending
+
+    def __build_request(self, article):
+        symbol = article["symbol"]
+        company = self.__company_names.get(symbol) or symbol
+
+        content = truncate_article(article["content"] or "", self.max_article_tokens, company_terms(symbol, company))
+
+        return {
+            "custom_id": f"article-{article['id']}",
+            "method": "POST",
+            "url": "/v1/responses",
+            "body": {
+                "model": self.model,
+                # Instructions first and identical in every request, so that the prompt cache can serve them
+                "input": [
+                    {"role": "developer", "content": SENTIMENT_INSTRUCTIONS},
+                    {"role": "user", "content": f"Symbol: {symbol}\nCompany: {company}\n\nArticle:\n{content}"}
+                ],
+                "prompt_cache_key": f"sentiment-v{PROMPT_VERSION}",
+                "temperature": 1,
+                "text": {"format": SENTIMENT_FORMAT},
+                "reasoning": {"effort": "low"}
+            },
+        }
+
+    def __create_jsonl_file(self, lines, filename):
         with open(filename, "w", encoding="utf-8") as f:
-            for article in articles:
-                company_data = CompanyRepository.get_company(article["symbol"])
-                company_name = company_data["name"] if company_data and company_data["name"] else article["symbol"]
-                
-                prompt = self.__build_prompt(
-                    article_content=article["content"],
-                    symbol=article["symbol"],
-                    company=company_name
-                )
-                
-                request = {
-                    "custom_id": f"article-{article['id']}",
-                    "method": "POST",
-                    "url": "/v1/responses",
-                    "body": {
-                        "model": self.model,
-                        "input": prompt,
-                        "temperature": 1,
-                        "text": {
-                            "format": {
-                                "type": "json_schema",
-                                "name": "sentiment_analysis",
-                                "schema": {
-                                    "type": "object",
-                                    "properties": {
-                                        "reasoning_process": {"type": "string"},
-                                        "sentiment_score": {"type": "number", "minimum": -1, "maximum": 1}
-                                    },
-                                    "required": ["reasoning_process", "sentiment_score"],
-                                    "additionalProperties": False
-                                },
-                                "strict": True
-                            }
-                        },
-                        "reasoning": {"effort": "low"}
-                    },
-                }
-                f.write(json.dumps(request) + "\n")
+            for line in lines:
+                f.write(line + "\n")
         return filename
 
+    def __submit_batch(self, batch):
+        """Upload the input file of a manifest entry and create its batch, recording every step"""
+        if batch["input_file_id"] is None:
+            batch["input_file_id"] = self.__upload_file(batch["input_file"])
+            SentimentBatchRepository.update_batch(batch["id"], input_file_id=batch["input_file_id"], status="uploaded")
+
+        batch["batch_id"] = self.__create_batch(batch["input_file_id"], f"Sentiment analysis {os.path.basename(batch['input_file'])}")
+        batch["status"] = "submitted"
+        SentimentBatchRepository.update_batch(batch["id"], batch_id=batch["batch_id"], status="submitted")
+
+        self.logger.info(f"Submitted batch with {len(batch['articles'])} requests and ID {batch['batch_id']}")
+
     def __upload_file(self, filename):
         file_obj = self.client.files.create(file=open(filename, "rb"), purpose="batch")
         return file_obj.id
@@ -161,46 +417,109 @@ class SentimentProcessor:
         batch = self.client.batches.create(
             input_file_id=file_id,
             endpoint="/v1/responses",
-            completion_window="24h",
+            completion_window=f"{BATCH_COMPLETION_HOURS}h",
             metadata={"description": description},
         )
         return batch.id
 
-    def __wait_for_all_batches(self, batch_ids, poll_interval):
-        completed = {}
-        total_batches = len(batch_ids)
-
-        while len(completed) < total_batches:
-            self.logger.info("Fetching batches states...")
-
-            for idx, batch_id in enumerate(batch_ids, start=1):
-                if batch_id in completed:
-                    continue
-
-                status_obj = self.client.batches.retrieve(batch_id)
-                status = status_obj.status
-
-                self.logger.info(f"[{idx}/{total_batches}] Batch {batch_id} status: {status}")
-
-                if status == "completed":
-                    completed[batch_id] = status_obj.output_file_id
+    async def __follow_batches(self, batches, wait=True):
+        # The async client is bound to the event loop of this run
+        async with AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY")) as client:
+            results = await asyncio.gather(
+                *[self.__follow_batch(client, batch, wait) for batch in batches], return_exceptions=True
+            )
+
+        for batch, result in zip(batches, results):
+            if isinstance(result, Exception):
+                self.logger.error(f"Error while following batch {batch['batch_id']}: {result}")
+
+    async def __follow_batch(self, client, batch, wait=True):
+        """Poll one batch until it ends (or only once without wait), then download and apply its results right away"""
+        interval = self.poll_min_interval
+        last_check, last_done = time.monotonic(), None
+
+        # Transient API errors are retried until the batch could no longer complete, or for at most
+        # one polling interval when only checking once; client errors (4xx) end the follow right away
+        deadline = last_check + (BATCH_COMPLETION_HOURS * 3600 if wait else self.poll_max_interval)
+
+        while True:
+            try:
+                status_obj = await client.batches.retrieve(batch["batch_id"])
+            except (APIConnectionError, RateLimitError, InternalServerError) as e:
+                if time.monotonic() + interval > deadline:
+                    raise
+
+                self.logger.warning(f"Could not check batch {batch['batch_id']}, retrying in {interval:.1f}s: {e}")
+                await asyncio.sleep(interval)
+                # Same back-off as when a batch makes no progress
+                interval = self.__next_poll_interval(interval, 0, None, 0, 0)
+                continue
 
-                elif status in ["failed", "expired", "cancelled"]:
-                    self.logger.error(f"[{idx}/{total_batches}] Batch {batch_id} ended with status: {status}")
-                    completed[batch_id] = None
+            status = status_obj.status
+            counts = status_obj.request_counts
 
-            if len(completed) < total_batches:
-                time.sleep(poll_interval)
+            self.logger.info(
+                f"Batch {batch['batch_id']} status: {status}"
+                + (f" ({counts.completed + counts.failed}/{counts.total})" if counts else "")
+            )
 
-        return completed
+            # Keep the manifest in sync, so that a rerun knows where every batch stands
+            if status != batch["status"]:
+                batch["status"] = status
+                await asyncio.to_thread(
+                    SentimentBatchRepository.update_batch, batch["id"], status=status, output_file_id=status_obj.output_file_id
+                )
 
-    def __download_results(self, file_id, filename):
-        file_response = self.client.files.content(file_id)
-        with open(filename, "wb") as f:
-            f.write(file_response.read())
+            if status == "completed":
+                break
+
+            if status in SentimentBatchRepository.FAILED_STATUSES:
+                self.logger.error(f"Batch {batch['batch_id']} ended with status: {status}")
+                return
+
+            if not wait:
+                return
+
+            now = time.monotonic()
+            done = counts.completed + counts.failed if counts else 0
+            interval = self.__next_poll_interval(interval, now - last_check, last_done, done, counts.total if counts else 0)
+            last_check, last_done = now, done
+
+            await asyncio.sleep(interval)
+
+        if status_obj.output_file_id:
+            stage_start = time.perf_counter()
+            await self.__download_results(client, status_obj.output_file_id, batch["output_file"])
+            self.timings["download"] += time.perf_counter() - stage_start
+
+            # Parsing and saving are blocking, keep them off the event loop
+            stage_start = time.perf_counter()
+            await asyncio.to_thread(self.__process_results, batch["output_file"], batch["articles"])
+            self.timings["apply"] += time.perf_counter() - stage_start
+            await asyncio.to_thread(SentimentBatchRepository.update_batch, batch["id"], status="applied", applied_at=datetime.now())
+
+    def __next_poll_interval(self, interval, elapsed, last_done, done, total):
+        """Wait about half the remaining time estimated from the progress, or back off when nothing moved"""
+        if last_done is not None and done > last_done and total:
+            rate = (done - last_done) / elapsed
+            interval = (total - done) / rate / 2
+        else:
+            interval *= 1.5
+
+        return min(max(interval, self.poll_min_interval), self.poll_max_interval)
+
+    async def __download_results(self, client, file_id, filename):
+        # Streamed to disk, so that large outputs are never held in memory
+        async with client.files.with_streaming_response.content(file_id) as response:
+            with open(filename, "wb") as f:
+                async for chunk in response.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
         return filename
 
-    def __process_results(self, filename):
+    def __process_results(self, filename, articles):
+        updates = []
+        cache_entries = {}
+
         with open(filename, "r", encoding="utf-8") as f:
             for line in f:
                 data = json.loads(line)
@@ -213,12 +532,30 @@ class SentimentProcessor:
                     content = data["response"]["body"]["output"][1]["content"][0]["text"]
 
                     parsed = json.loads(content)
-                    sentiment_score = parsed["sentiment_score"]
-                    sentiment_reasoning = parsed["reasoning_process"]
+                    result = {"sentiment_score": parsed["sentiment_score"], "sentiment_reasoning": parsed["reasoning_process"]}
                     article_id = int(data["custom_id"].split("-")[1])
 
-                    NewsRepository.update_article_sentiment(article_id, sentiment_score, sentiment_reasoning)
+                    entry = articles.get(article_id, {"key": None, "duplicates": []})
+                    for duplicate_id in [article_id] + entry["duplicates"]:
+                        updates.append({"id": duplicate_id, **result, "sentiment_source": self.source})
+
+                    if entry["key"] is not None:
+                        cache_entries[entry["key"]] = result
 
                 except Exception as e:
                     self.logger.error(f"Error parsing result for {data.get('custom_id')}: {e}")
-                    self.logger.error(f"Response structure: {data.get('response', {})}")
\ No newline at end of file
+                    self.logger.error(f"Response structure: {data.get('response', {})}")
+
+                if len(updates) >= RESULTS_FLUSH_SIZE:
+                    self.__save_results(updates, cache_entries)
+                    updates, cache_entries = [], {}
+
+        self.__save_results(updates, cache_entries)
+
+    def __save_results(self, updates, cache_entries):
+        if updates:
+            NewsRepository.update_articles_sentiment(updates)
+            with self.__stats_lock:
+                self.__stats["scored"] += len(updates)
+        if cache_entries:
+            self.sentiment_cache.set_many_json(cache_entries)
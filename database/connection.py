@@ -1,15 +1,105 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from contextlib import contextmanager
 import os
 from dotenv import load_dotenv
+from utils.logging_utils import get_logger
 
 # Load environment variables from .env
 load_dotenv()
 
+logger = get_logger(__name__)
+
 DATABASE_URL = os.getenv("DATABASE_URL")
-# check_same_thread flag added for multithreading
-engine = create_engine(DATABASE_URL, echo=False, connect_args={"check_same_thread": False})
+
+# SQLite PRAGMA sets applied to every new connection.
+# "ingest" trades a little durability (the last transactions may be lost on power failure, never corrupted)
+# for much faster writes, "read_only" is meant for simulation processes that only query the database.
+SQLITE_PROFILES = {
+    "default": {},
+    "ingest": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -262144,      # negative values are KiB, i.e. 256 MiB
+        "mmap_size": 1073741824,    # 1 GiB
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000       # milliseconds
+    },
+    "read_only": {
+        # The journal mode is persistent in the file, readers keep whatever the writer set
+        "cache_size": -524288,      # 512 MiB
+        "mmap_size": 4294967296,    # 4 GiB
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000,
+        "query_only": "ON"
+    }
+}
+
+# PRAGMAs that can be overridden one by one from the environment, e.g. SQLITE_CACHE_SIZE=-65536
+SQLITE_PRAGMA_ENV = {
+    "journal_mode": "SQLITE_JOURNAL_MODE",
+    "synchronous": "SQLITE_SYNCHRONOUS",
+    "cache_size": "SQLITE_CACHE_SIZE",
+    "mmap_size": "SQLITE_MMAP_SIZE",
+    "temp_store": "SQLITE_TEMP_STORE",
+    "busy_timeout": "SQLITE_BUSY_TIMEOUT"
+}
+
+
+def get_sqlite_pragmas(profile: str) -> dict:
+    """Resolve the PRAGMAs of a profile, applying the per-PRAGMA environment overrides"""
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLite profile: {profile}")
+
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for pragma, env_name in SQLITE_PRAGMA_ENV.items():
+        value = os.getenv(env_name)
+        if value:
+            pragmas[pragma] = value
+    return pragmas
+
+
+def apply_sqlite_profile(engine, profile: str):
+    """Register a connect listener that applies the profile PRAGMAs to every pooled connection"""
+    pragmas = get_sqlite_pragmas(profile)
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            # busy_timeout goes first so that switching journal mode waits for concurrent writers
+            if "busy_timeout" in pragmas:
+                cursor.execute(f"PRAGMA busy_timeout = {pragmas['busy_timeout']}")
+
+            for pragma, value in pragmas.items():
+                if pragma == "busy_timeout":
+                    continue
+                try:
+                    cursor.execute(f"PRAGMA {pragma} = {value}")
+                except Exception as e:
+                    # e.g. the journal mode cannot change while another process holds the database
+                    logger.warning(f"Could not apply PRAGMA {pragma} = {value}: {e}")
+        finally:
+            cursor.close()
+
+    return engine
+
+
+def create_db_engine(profile: str = None, database_url: str = None):
+    """Create an engine for the configured database with the given SQLite performance profile"""
+    database_url = database_url or DATABASE_URL
+    profile = profile or os.getenv("SQLITE_PROFILE", "ingest")
+
+    if not database_url.startswith("sqlite"):
+        return create_engine(database_url, echo=False)
+
+    # check_same_thread flag added for multithreading: pooled connections can be checked out from any
+    # thread, and every one of them gets the profile PRAGMAs when it is first opened
+    db_engine = create_engine(database_url, echo=False, connect_args={"check_same_thread": False})
+    return apply_sqlite_profile(db_engine, profile)
+
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -29,4 +119,4 @@ def db_transaction():
         session.rollback()
         raise
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
@@ -0,0 +1,252 @@
+import json
+import time
+from sqlalchemy import inspect, text
+from database.models import Base, Company, NewsArticle
+from database.connection import engine as default_engine
+from utils.logging_utils import get_logger
+from utils.article_utils import normalize_url, content_hash
+
+logger = get_logger(__name__)
+
+# Rows touched per transaction by the chunked backfills, so that readers are never blocked for long
+MIGRATION_CHUNK_SIZE = 50000
+
+# Registered migrations as (version, description, function), applied in version order.
+# Every migration must be idempotent: on a fresh database the first one already creates
+# the tables with their current definition, and the following ones must then be no-ops.
+MIGRATIONS = []
+
+
+def migration(version: int, description: str):
+    """Register a function as the migration bringing the schema to the given version"""
+    def decorator(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return func
+    return decorator
+
+
+def get_schema_version(engine=None) -> int:
+    """Current schema version, stored in the SQLite user_version header field"""
+    with (engine or default_engine).connect() as conn:
+        return conn.execute(text("PRAGMA user_version")).scalar()
+
+
+def set_schema_version(engine, version: int):
+    with engine.begin() as conn:
+        conn.execute(text(f"PRAGMA user_version = {int(version)}"))
+
+
+def create_missing_tables(engine):
+    """Create the tables (and their declared indexes) that do not exist yet, leaving existing ones untouched"""
+    Base.metadata.create_all(engine, checkfirst=True)
+
+
+def add_missing_columns(engine, model):
+    """ALTER TABLE ADD COLUMN for every column declared on the model but missing in the database"""
+    table = model.__table__
+    existing = {column["name"] for column in inspect(engine).get_columns(table.name)}
+
+    with engine.begin() as conn:
+        for column in table.columns:
+            if column.name in existing:
+                continue
+
+            column_type = column.type.compile(dialect=engine.dialect)
+            logger.info(f"Adding column {table.name}.{column.name} ({column_type})")
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+
+def create_index(engine, name: str, table: str, columns: list, unique: bool = False):
+    """Build an index in its own short transaction.
+
+    SQLite holds the write lock while the index is built, but with the WAL journal
+    readers keep working, so only writers wait for it.
+    """
+    start = time.perf_counter()
+    unique_sql = "UNIQUE " if unique else ""
+
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+    logger.info(f"Index {name} ready in {time.perf_counter() - start:.1f}s")
+
+
+def drop_index(engine, name: str):
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def iter_rowid_ranges(engine, table: str, chunk_size: int = MIGRATION_CHUNK_SIZE):
+    """Yield (first, last) rowid ranges covering the table in chunks of chunk_size rowids"""
+    with engine.connect() as conn:
+        first, last = conn.execute(text(f"SELECT MIN(rowid), MAX(rowid) FROM {table}")).one()
+
+    if first is None:
+        return
+
+    for low in range(first, last + 1, chunk_size):
+        yield low, min(low + chunk_size - 1, last)
+
+
+def backfill_in_chunks(engine, table: str, set_clause: str, where_clause: str = "1 = 1",
+                       chunk_size: int = MIGRATION_CHUNK_SIZE, params: dict = None):
+    """Run UPDATE table SET set_clause WHERE where_clause one rowid range per transaction"""
+    updated = 0
+
+    for low, high in iter_rowid_ranges(engine, table, chunk_size):
+        with engine.begin() as conn:
+            result = conn.execute(
+                text(f"UPDATE {table} SET {set_clause} WHERE rowid BETWEEN :low AND :high AND ({where_clause})"),
+                {"low": low, "high": high, **(params or {})}
+            )
+            updated += result.rowcount
+
+    logger.info(f"Backfilled {updated} rows of {table}")
+    return updated
+
+
+def delete_in_chunks(engine, table: str, where_clause: str, chunk_size: int = MIGRATION_CHUNK_SIZE):
+    """DELETE the rows matching where_clause, at most chunk_size rows per transaction"""
+    deleted = 0
+
+    while True:
+        with engine.begin() as conn:
+            result = conn.execute(text(
+                f"DELETE FROM {table} WHERE rowid IN "
+                f"(SELECT rowid FROM {table} WHERE {where_clause} LIMIT {int(chunk_size)})"
+            ))
+
+        deleted += result.rowcount
+        if result.rowcount < chunk_size:
+            break
+
+    if deleted:
+        logger.info(f"Deleted {deleted} rows from {table}")
+    return deleted
+
+
+@migration(1, "Create base tables")
+def create_base_tables(engine):
+    create_missing_tables(engine)
+
+
+@migration(2, "Date lookup indexes")
+def create_date_indexes(engine):
+    create_index(engine, "idx_stock_date", "stock_prices", ["date"])
+    create_index(engine, "idx_earnings_date", "earnings_dates", ["date"])
+    create_index(engine, "idx_news_symbol_date", "news_articles", ["symbol", "date"])
+    create_index(engine, "idx_news_date", "news_articles", ["date"])
+
+
+@migration(3, "Natural-key unique indexes")
+def create_natural_keys(engine):
+    # Keep the most recent copy of every duplicated row before enforcing uniqueness
+    for table, key in [("stock_prices", "symbol, date"), ("earnings_dates", "symbol, date")]:
+        delete_in_chunks(engine, table, f"id NOT IN (SELECT MAX(id) FROM {table} GROUP BY {key})")
+
+    # Articles without url never conflict with each other. Among duplicated articles a scored copy
+    # is kept over a more recent unscored one, so that no sentiment score is lost
+    delete_in_chunks(
+        engine, "news_articles",
+        "id IN (SELECT id FROM ("
+        "SELECT id, ROW_NUMBER() OVER (PARTITION BY symbol, url ORDER BY sentiment_score IS NULL, id DESC) AS copy "
+        "FROM news_articles WHERE url IS NOT NULL) WHERE copy > 1)"
+    )
+
+    # The old non-unique indexes are superseded by the unique ones
+    drop_index(engine, "idx_stock_symbol_date")
+    drop_index(engine, "idx_earnings_symbol_date")
+
+    create_index(engine, "uq_stock_symbol_date", "stock_prices", ["symbol", "date"], unique=True)
+    create_index(engine, "uq_earnings_symbol_date", "earnings_dates", ["symbol", "date"], unique=True)
+    create_index(engine, "uq_news_symbol_url", "news_articles", ["symbol", "url"], unique=True)
+
+
+@migration(4, "Shared article contents and URL index")
+def create_article_contents(engine):
+    create_missing_tables(engine)
+    add_missing_columns(engine, NewsArticle)
+    create_index(engine, "idx_news_content_id", "news_articles", ["content_id"])
+
+    # Move every stored text into article_contents, once per distinct text, one rowid range per transaction
+    moved = 0
+    for low, high in iter_rowid_ranges(engine, "news_articles"):
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                "SELECT id, url, content FROM news_articles "
+                "WHERE rowid BETWEEN :low AND :high AND content IS NOT NULL AND content_id IS NULL"
+            ), {"low": low, "high": high}).all()
+
+            if not rows:
+                continue
+
+            hashes = {row.id: content_hash(row.content) for row in rows}
+            conn.execute(
+                text("INSERT INTO article_contents (content_hash, content) VALUES (:hash, :content) "
+                     "ON CONFLICT (content_hash) DO NOTHING"),
+                [{"hash": hashes[row.id], "content": row.content} for row in rows]
+            )
+            content_ids = dict(conn.execute(text(
+                "SELECT content_hash, id FROM article_contents WHERE content_hash IN "
+                "(SELECT value FROM json_each(:hashes))"
+            ), {"hashes": json.dumps(list(set(hashes.values())))}).all())
+
+            urls = [
+                {"url": normalize_url(row.url), "content_id": content_ids[hashes[row.id]]}
+                for row in rows if row.url
+            ]
+            if urls:
+                conn.execute(
+                    text("INSERT INTO article_urls (url, content_id) VALUES (:url, :content_id) "
+                         "ON CONFLICT (url) DO NOTHING"),
+                    urls
+                )
+
+            conn.execute(
+                text("UPDATE news_articles SET content_id = :content_id, content = NULL WHERE id = :id"),
+                [{"id": row.id, "content_id": content_ids[hashes[row.id]]} for row in rows]
+            )
+            moved += len(rows)
+
+    logger.info(f"Moved {moved} article texts to article_contents")
+
+
+@migration(5, "Stock price coverage index")
+def create_price_coverage(engine):
+    create_missing_tables(engine)
+
+
+@migration(6, "Company refresh timestamps")
+def add_company_updated_at(engine):
+    add_missing_columns(engine, Company)
+
+
+@migration(7, "Sentiment batch manifest")
+def create_sentiment_batches(engine):
+    create_missing_tables(engine)
+
+
+@migration(8, "Sentiment score source")
+def add_sentiment_source(engine):
+    add_missing_columns(engine, NewsArticle)
+
+
+def run_migrations(engine=None) -> int:
+    """Apply, in order, every migration newer than the current schema version"""
+    engine = engine or default_engine
+    current_version = get_schema_version(engine)
+    pending = [m for m in MIGRATIONS if m[0] > current_version]
+
+    if not pending:
+        logger.info(f"Database schema is up to date (version {current_version})")
+        return current_version
+
+    for version, description, func in pending:
+        logger.info(f"Applying migration {version}: {description}...")
+        start = time.perf_counter()
+        func(engine)
+        set_schema_version(engine, version)
+        logger.info(f"Migration {version} applied in {time.perf_counter() - start:.1f}s")
+
+    return pending[-1][0]
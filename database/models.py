@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Float, Text, ForeignKey, BigInteger
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, Text, ForeignKey, BigInteger, Index
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
@@ -10,6 +10,7 @@ class Company(Base):
     name = Column(String(255))
     market_cap = Column(BigInteger)
     sector = Column(String(100))
+    updated_at = Column(DateTime)
     
     # Relationships
     stock_prices = relationship("StockPrice", back_populates="company")
@@ -31,6 +32,24 @@ class StockPrice(Base):
     # Relationship
     company = relationship("Company", back_populates="stock_prices")
 
+    # Natural key, used as conflict target by the upserts
+    __table_args__ = (
+        Index("uq_stock_symbol_date", "symbol", "date", unique=True),
+    )
+
+class PriceCoverage(Base):
+    """Date range whose daily bars have already been downloaded for a symbol"""
+    __tablename__ = "price_coverage"
+
+    id = Column(Integer, primary_key=True)
+    symbol = Column(String(10), nullable=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+
+    __table_args__ = (
+        Index("idx_price_coverage_symbol", "symbol"),
+    )
+
 class EarningsDate(Base):
     __tablename__ = "earnings_dates"
     
@@ -44,6 +63,11 @@ class EarningsDate(Base):
     # Relationship
     company = relationship("Company", back_populates="earnings_dates")
 
+    # Natural key, used as conflict target by the upserts
+    __table_args__ = (
+        Index("uq_earnings_symbol_date", "symbol", "date", unique=True),
+    )
+
 class NewsArticle(Base):
     __tablename__ = "news_articles"
     
@@ -57,6 +81,48 @@ class NewsArticle(Base):
     url = Column(Text)
     sentiment_score = Column(Float)
     sentiment_reasoning = Column(Text)
+    # Backend that produced the score, NULL for scores from before it was recorded (the OpenAI models)
+    sentiment_source = Column(String(32))
+    content_id = Column(Integer, ForeignKey("article_contents.id"))
     
-    # Relationship
-    company = relationship("Company", back_populates="news_articles")
\ No newline at end of file
+    # Relationships
+    company = relationship("Company", back_populates="news_articles")
+    shared_content = relationship("ArticleContent")
+
+    # Natural key, used as conflict target by the upserts
+    __table_args__ = (
+        Index("uq_news_symbol_url", "symbol", "url", unique=True),
+        Index("idx_news_content_id", "content_id"),
+    )
+
+class ArticleContent(Base):
+    """Extracted text of an article, stored once however many (symbol, date) rows link to it"""
+    __tablename__ = "article_contents"
+
+    id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), nullable=False, unique=True)
+    content = Column(Text, nullable=False)
+
+class ArticleUrl(Base):
+    """Normalized article URLs already downloaded, with the content they resolved to"""
+    __tablename__ = "article_urls"
+
+    url = Column(Text, primary_key=True)
+    content_id = Column(Integer, ForeignKey("article_contents.id"), nullable=False)
+
+class SentimentBatch(Base):
+    """Manifest of a sentiment batch submitted to OpenAI, kept until its results are applied"""
+    __tablename__ = "sentiment_batches"
+
+    id = Column(Integer, primary_key=True)
+    input_file = Column(Text, nullable=False)
+    output_file = Column(Text, nullable=False)
+    # JSON object: submitted article id -> {"key": sentiment cache key, "duplicates": [article ids]}
+    articles = Column(Text, nullable=False)
+    input_file_id = Column(String(100))
+    batch_id = Column(String(100), unique=True)
+    output_file_id = Column(String(100))
+    status = Column(String(20), nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    applied_at = Column(DateTime)
@@ -0,0 +1,132 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+from database.repositories import StockPriceRepository
+from utils.logging_utils import get_logger
+
+# Column name -> on-disk dtype. Dates use second resolution so pandas can wrap them without a copy.
+PRICE_CACHE_COLUMNS = {
+    "date": "datetime64[s]",
+    "open": "float64",
+    "high": "float64",
+    "low": "float64",
+    "close": "float64",
+    "volume": "int64"
+}
+
+# Symbols materialized per database query during a refresh
+REFRESH_CHUNK_SIZE = 200
+
+
+class PriceCache:
+    """Columnar copy of stock_prices: one directory per symbol with one .npy file per column.
+
+    Files are loaded memory-mapped, so reading a symbol costs no parsing and no copy.
+    A manifest keeps the (rows, first date, last date, sum of closes) of every cached
+    symbol, and refresh() only rewrites the symbols whose statistics changed.
+    """
+
+    def __init__(self, cache_dir: str = None):
+        self.logger = get_logger(__name__)
+
+        self.cache_dir = cache_dir or os.getenv("PRICE_CACHE_DIR", "price_cache")
+        self.manifest_path = os.path.join(self.cache_dir, "manifest.json")
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def refresh(self, symbols: List[str] = None) -> int:
+        """Bring the cache in sync with the database, for the given symbols or for all of them"""
+        manifest = self.__load_manifest()
+        statistics = StockPriceRepository.get_price_statistics(symbols)
+
+        # JSON turns tuples into lists, compare them in the same shape
+        stale = [symbol for symbol, stats in statistics.items() if manifest.get(symbol) != list(stats)]
+
+        # Symbols no longer in the database are dropped from the cache
+        removed = [symbol for symbol in manifest if symbol not in statistics]
+        if symbols is not None:
+            requested = set(symbols)
+            removed = [symbol for symbol in removed if symbol in requested]
+
+        for symbol in removed:
+            shutil.rmtree(self.__symbol_dir(symbol), ignore_errors=True)
+            del manifest[symbol]
+
+        for start in range(0, len(stale), REFRESH_CHUNK_SIZE):
+            chunk = stale[start:start + REFRESH_CHUNK_SIZE]
+            prices = StockPriceRepository.get_prices_for_symbols(chunk)
+
+            for symbol, symbol_prices in prices.groupby("symbol", sort=False):
+                self.__write_symbol(symbol, symbol_prices)
+                manifest[symbol] = list(statistics[symbol])
+
+            self.__save_manifest(manifest)
+
+        self.__save_manifest(manifest)
+        self.logger.info(f"Price cache refreshed: {len(stale)} symbols rewritten, {len(removed)} removed")
+        return len(stale)
+
+    def symbols(self) -> List[str]:
+        """Symbols currently materialized in the cache"""
+        return sorted(self.__load_manifest().keys())
+
+    def load(self, symbol: str) -> Optional[Dict[str, np.ndarray]]:
+        """Read-only memory-mapped column arrays of a symbol, or None if the symbol is not cached"""
+        symbol_dir = self.__symbol_dir(symbol)
+        if not os.path.isdir(symbol_dir):
+            return None
+
+        return {
+            column: np.load(os.path.join(symbol_dir, f"{column}.npy"), mmap_mode="r")
+            for column in PRICE_CACHE_COLUMNS
+        }
+
+    def load_frame(self, symbol: str) -> Optional[pd.DataFrame]:
+        """DataFrame view over the memory-mapped columns of a symbol"""
+        arrays = self.load(symbol)
+        if arrays is None:
+            return None
+        # Built from the dict without copy, every column stays a view on its mapped file
+        return pd.DataFrame(arrays, copy=False)
+
+    def __write_symbol(self, symbol, prices):
+        symbol_dir = self.__symbol_dir(symbol)
+        tmp_dir = symbol_dir + ".tmp"
+        old_dir = symbol_dir + ".old"
+
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        prices = prices.sort_values("date")
+        dates = pd.to_datetime(prices["date"]).to_numpy().astype(PRICE_CACHE_COLUMNS["date"])
+        np.save(os.path.join(tmp_dir, "date.npy"), dates)
+
+        for column, dtype in PRICE_CACHE_COLUMNS.items():
+            if column != "date":
+                np.save(os.path.join(tmp_dir, f"{column}.npy"), prices[column].to_numpy(dtype=dtype))
+
+        # Swap directories so readers never see a partially written symbol; already
+        # mapped files of the old version stay valid until they are unmapped
+        if os.path.isdir(symbol_dir):
+            shutil.rmtree(old_dir, ignore_errors=True)
+            os.rename(symbol_dir, old_dir)
+        os.rename(tmp_dir, symbol_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def __symbol_dir(self, symbol):
+        return os.path.join(self.cache_dir, symbol)
+
+    def __load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def __save_manifest(self, manifest):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
@@ -0,0 +1,81 @@
+import numpy as np
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+# Inclusive (first date, last date) range of days
+DateRange = Tuple[date, date]
+
+
+def merge_ranges(ranges: Iterable[DateRange], tolerance_days: int = 1) -> List[DateRange]:
+    """Sort ranges and merge the ones overlapping or closer than tolerance_days"""
+    merged = []
+
+    for start, end in sorted(ranges):
+        if merged and (start - merged[-1][1]).days <= tolerance_days:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    return merged
+
+
+def missing_ranges(covered: List[DateRange], start: date, end: date) -> List[DateRange]:
+    """Parts of [start, end] not covered by the (merged, sorted) covered ranges"""
+    missing = []
+    cursor = start
+
+    for covered_start, covered_end in covered:
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > cursor:
+            missing.append((cursor, covered_start - timedelta(days=1)))
+        cursor = max(cursor, covered_end + timedelta(days=1))
+
+    if cursor <= end:
+        missing.append((cursor, end))
+
+    return missing
+
+
+def ranges_from_dates(dates: Iterable[date], max_gap_business_days: int) -> List[DateRange]:
+    """Coverage implied by stored bars: runs of dates whose holes are at most max_gap_business_days long.
+
+    Shorter holes are taken for market holidays, longer ones are reported as gaps.
+    """
+    dates = np.array(sorted(set(dates)), dtype="datetime64[D]")
+    if len(dates) == 0:
+        return []
+
+    # Business days strictly between consecutive bars
+    holes = np.busday_count(dates[:-1] + 1, dates[1:])
+    breaks = np.flatnonzero(holes > max_gap_business_days)
+
+    starts = np.concatenate([dates[:1], dates[breaks + 1]])
+    ends = np.concatenate([dates[breaks], dates[-1:]])
+
+    return [(s.item(), e.item()) for s, e in zip(starts, ends)]
+
+
+def business_days(ranges: Iterable[DateRange]) -> int:
+    """Number of weekdays in the ranges, an estimate of the bars they hold"""
+    return int(sum(np.busday_count(start, end + timedelta(days=1)) for start, end in ranges))
+
+
+def plan_requests(coverage: Dict[str, List[DateRange]], symbols: List[str], start: date, end: date,
+                  merge_days: int) -> Dict[DateRange, List[str]]:
+    """Group the symbols by the ranges they miss in [start, end].
+
+    Gaps of a symbol closer than merge_days are fetched with one request, re-downloading
+    the few days between them. Symbols missing the same range end up in the same group,
+    so they can share a multi-ticker download. Gaps made only of weekend days are skipped.
+    """
+    requests = {}
+
+    for symbol in symbols:
+        gaps = [gap for gap in missing_ranges(coverage.get(symbol, []), start, end) if business_days([gap]) > 0]
+        for gap in merge_ranges(gaps, merge_days):
+            requests.setdefault(gap, []).append(symbol)
+
+    return requests
@@ -1,12 +1,94 @@
-from sqlalchemy import and_
-from database.models import Company, StockPrice, EarningsDate, NewsArticle
+import json
+import pandas as pd
+from sqlalchemy import and_, or_, func, select, tuple_, delete, insert, update, bindparam
+from sqlalchemy.orm import joinedload
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database.models import (
+    Company, StockPrice, PriceCoverage, EarningsDate, NewsArticle, ArticleContent, ArticleUrl, SentimentBatch
+)
 from database.connection import db_transaction
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union, Tuple
 from datetime import datetime
-from shared.utils.logging_utils import get_logger
+from utils.logging_utils import get_logger
+from utils.article_utils import content_hash
+from database.price_coverage import DateRange, merge_ranges
 
 logger = get_logger(__name__)
 
+# Number of rows sent to the database in a single executemany call
+BULK_CHUNK_SIZE = 5000
+
+# Number of keys bound in a single IN (...) clause
+IN_CLAUSE_CHUNK_SIZE = 500
+
+STOCK_PRICE_COLUMNS = ["symbol", "date", "open", "high", "low", "close", "volume"]
+EARNINGS_COLUMNS = ["symbol", "date", "eps_estimate", "eps_actual", "surprise"]
+COMPANY_COLUMNS = ["symbol", "name", "market_cap", "sector", "updated_at"]
+NEWS_COLUMNS = [
+    "symbol", "date", "headline", "summary", "content", "source", "url",
+    "sentiment_score", "sentiment_reasoning", "content_id"
+]
+
+
+def _to_records(data: Union[List[Dict], pd.DataFrame], columns: List[str]) -> List[Dict]:
+    """Convert a DataFrame or a list of dicts into plain records restricted to the given columns"""
+    if isinstance(data, pd.DataFrame):
+        frame = data[columns]
+        # Casting to object turns numpy scalars into Python ones and lets NaN become None
+        frame = frame.astype(object).where(frame.notna(), None)
+        return frame.to_dict(orient="records")
+
+    return [{column: row.get(column) for column in columns} for row in data]
+
+
+def _chunks(records: List[Dict], size: int = BULK_CHUNK_SIZE):
+    """Yield consecutive slices of at most size records"""
+    for start in range(0, len(records), size):
+        yield records[start:start + size]
+
+
+def _read_frame(session, stmt, columns: List[str]) -> pd.DataFrame:
+    """Execute a Core SELECT and load the rows straight into a DataFrame"""
+    return pd.DataFrame(session.execute(stmt).all(), columns=columns)
+
+
+def _concat_frames(frames: List[pd.DataFrame], columns: List[str]) -> pd.DataFrame:
+    """Concatenate the per-chunk frames, or return an empty frame with the given columns"""
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _frame_result(frame: pd.DataFrame, as_records: bool):
+    """Return the frame, or a NumPy record array of it when as_records is set"""
+    return frame.to_records(index=False) if as_records else frame
+
+
+def _article_content(article: NewsArticle) -> Optional[str]:
+    """Text of an article row, stored either on the row or in the shared article_contents table"""
+    if article.content is None and article.shared_content is not None:
+        return article.shared_content.content
+    return article.content
+
+
+def _upsert(session, model, records: List[Dict], conflict_columns: List[str], update_columns: List[str] = None):
+    """Chunked INSERT ... ON CONFLICT on the natural key: DO UPDATE the given columns, or DO NOTHING if none"""
+    # Core insert on the table: the ORM bulk path splits the rows into one statement per
+    # run of records with the same NULL columns, which defeats executemany on sparse data
+    stmt = sqlite_insert(model.__table__)
+
+    if update_columns:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=conflict_columns,
+            set_={column: stmt.excluded[column] for column in update_columns}
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+
+    for chunk in _chunks(records):
+        session.execute(stmt, chunk)
+
+
 class CompanyRepository:
     @staticmethod
     def save_company(symbol: str, name: str, market_cap: int = None, sector: str = None):
@@ -19,25 +101,49 @@ class CompanyRepository:
                 company.name = name
                 company.market_cap = market_cap
                 company.sector = sector
+                company.updated_at = datetime.now()
             else:
                 # Create new
                 company = Company(
                     symbol=symbol,
                     name=name,
                     market_cap=market_cap,
-                    sector=sector
+                    sector=sector,
+                    updated_at=datetime.now()
                 )
                 session.add(company)
                 
             logger.debug(f"Saved company: {symbol} - {name}")
 
+    @staticmethod
+    def save_companies(companies: Union[List[Dict], pd.DataFrame]):
+        """Batch insert or update companies"""
+        records = _to_records(companies, COMPANY_COLUMNS)
+
+        with db_transaction() as session:
+            _upsert(session, Company, records, ["symbol"], ["name", "market_cap", "sector", "updated_at"])
+
+            logger.info(f"Saved {len(records)} companies")
+
     @staticmethod
     def get_all_symbols() -> List[str]:
         """Get all company symbols"""
         with db_transaction() as session:
-            symbols = session.query(EarningsDate.symbol).all()
+            symbols = session.query(EarningsDate.symbol).distinct().order_by(EarningsDate.symbol).all()
             return [s[0] for s in symbols]
 
+    @staticmethod
+    def get_update_times(symbols: List[str]) -> Dict[str, Optional[datetime]]:
+        """Get when the data of each stored company was last refreshed (None if never tracked)"""
+        update_times = {}
+
+        with db_transaction() as session:
+            for chunk in _chunks(list(symbols), IN_CLAUSE_CHUNK_SIZE):
+                stmt = select(Company.symbol, Company.updated_at).where(Company.symbol.in_(chunk))
+                update_times.update(session.execute(stmt).all())
+
+        return update_times
+
     @staticmethod
     def get_companies_by_market_cap(min_cap: int, max_cap: int) -> List[Dict]:
         """Get companies within market cap range"""
@@ -73,24 +179,22 @@ class CompanyRepository:
                 }
             return None
 
+    @staticmethod
+    def get_company_names() -> Dict[str, str]:
+        """Name of every company by symbol, in a single query"""
+        with db_transaction() as session:
+            return {symbol: name for symbol, name in session.query(Company.symbol, Company.name).all()}
+
 class StockPriceRepository:
     @staticmethod
-    def save_stock_prices(stock_data: List[Dict]):
-        """Batch save stock prices"""
+    def save_stock_prices(stock_data: Union[List[Dict], pd.DataFrame]):
+        """Batch upsert stock prices on (symbol, date) (accepts a list of dicts or a DataFrame)"""
+        records = _to_records(stock_data, STOCK_PRICE_COLUMNS)
+
         with db_transaction() as session:
-            for data in stock_data:
-                stock_price = StockPrice(
-                    symbol=data["symbol"],
-                    date=data["date"],
-                    open=data["open"],
-                    high=data["high"],
-                    low=data["low"],
-                    close=data["close"],
-                    volume=data["volume"]
-                )
-                session.add(stock_price)
+            _upsert(session, StockPrice, records, ["symbol", "date"], ["open", "high", "low", "close", "volume"])
             
-            logger.info(f"Saved {len(stock_data)} stock price records")
+            logger.info(f"Saved {len(records)} stock price records")
 
     @staticmethod
     def get_prices_for_symbol(symbol: str, start_date: datetime, end_date: datetime) -> List[Dict]:
@@ -140,22 +244,115 @@ class StockPriceRepository:
                 }
             return None
 
-class EarningsRepository:
     @staticmethod
-    def save_earnings_dates(earnings_data: List[Dict]):
-        """Batch save earnings dates"""
+    def get_price_statistics(symbols: List[str] = None) -> Dict[str, tuple]:
+        """Get (row count, first date, last date, sum of closes) per symbol, used to detect changed series"""
+        columns = [
+            StockPrice.symbol,
+            func.count(StockPrice.id),
+            func.min(StockPrice.date),
+            func.max(StockPrice.date),
+            func.sum(StockPrice.close)
+        ]
+
+        with db_transaction() as session:
+            if symbols is None:
+                rows = session.execute(select(*columns).group_by(StockPrice.symbol)).all()
+            else:
+                rows = []
+                for chunk in _chunks(list(symbols), IN_CLAUSE_CHUNK_SIZE):
+                    stmt = select(*columns).where(StockPrice.symbol.in_(chunk)).group_by(StockPrice.symbol)
+                    rows.extend(session.execute(stmt).all())
+
+            return {row[0]: (row[1], str(row[2]), str(row[3]), row[4]) for row in rows}
+
+    @staticmethod
+    def get_prices_for_symbols(symbols: List[str], start_date: datetime = None, end_date: datetime = None,
+                               as_records: bool = False) -> pd.DataFrame:
+        """Get stock prices for many symbols as a DataFrame sorted by symbol and date, without ORM hydration"""
+        table = StockPrice.__table__
+        frames = []
+
+        with db_transaction() as session:
+            for chunk in _chunks(list(symbols), IN_CLAUSE_CHUNK_SIZE):
+                stmt = select(*[table.c[column] for column in STOCK_PRICE_COLUMNS]).where(table.c.symbol.in_(chunk))
+                if start_date is not None:
+                    stmt = stmt.where(table.c.date >= start_date)
+                if end_date is not None:
+                    stmt = stmt.where(table.c.date <= end_date)
+
+                frames.append(_read_frame(session, stmt, STOCK_PRICE_COLUMNS))
+
+        prices = _concat_frames(frames, STOCK_PRICE_COLUMNS).sort_values(["symbol", "date"], ignore_index=True)
+        return _frame_result(prices, as_records)
+
+    @staticmethod
+    def get_prices_on_dates(keys: List[Tuple[str, datetime]], as_records: bool = False) -> pd.DataFrame:
+        """Get the stock prices of many (symbol, date) pairs in a few queries"""
+        table = StockPrice.__table__
+        frames = []
+
         with db_transaction() as session:
-            for data in earnings_data:
-                earnings = EarningsDate(
-                    symbol=data["symbol"],
-                    date=data["date"],
-                    eps_estimate=data["eps_estimate"],
-                    eps_actual=data["eps_actual"],
-                    surprise=data["surprise"]
+            for chunk in _chunks(list(keys), IN_CLAUSE_CHUNK_SIZE):
+                stmt = select(*[table.c[column] for column in STOCK_PRICE_COLUMNS]).where(
+                    tuple_(table.c.symbol, table.c.date).in_(chunk)
                 )
-                session.add(earnings)
+                frames.append(_read_frame(session, stmt, STOCK_PRICE_COLUMNS))
+
+        prices = _concat_frames(frames, STOCK_PRICE_COLUMNS).sort_values(["symbol", "date"], ignore_index=True)
+        return _frame_result(prices, as_records)
+
+    @staticmethod
+    def get_price_coverage(symbols: List[str]) -> Dict[str, List[DateRange]]:
+        """Get the date ranges already downloaded per symbol, sorted by start date"""
+        coverage = {}
+
+        with db_transaction() as session:
+            for chunk in _chunks(list(symbols), IN_CLAUSE_CHUNK_SIZE):
+                stmt = select(PriceCoverage.symbol, PriceCoverage.start_date, PriceCoverage.end_date).where(
+                    PriceCoverage.symbol.in_(chunk)
+                ).order_by(PriceCoverage.symbol, PriceCoverage.start_date)
+
+                for symbol, start_date, end_date in session.execute(stmt):
+                    coverage.setdefault(symbol, []).append((start_date, end_date))
+
+        return coverage
+
+    @staticmethod
+    def save_price_coverage(ranges: List[Tuple[str, datetime, datetime]]):
+        """Add downloaded (symbol, start_date, end_date) ranges, merging them with the stored ones"""
+        new_ranges = {}
+        for symbol, start_date, end_date in ranges:
+            new_ranges.setdefault(symbol, []).append((start_date, end_date))
+
+        with db_transaction() as session:
+            for chunk in _chunks(list(new_ranges), IN_CLAUSE_CHUNK_SIZE):
+                stored = session.execute(
+                    select(PriceCoverage.symbol, PriceCoverage.start_date, PriceCoverage.end_date)
+                    .where(PriceCoverage.symbol.in_(chunk))
+                ).all()
+                for symbol, start_date, end_date in stored:
+                    new_ranges[symbol].append((start_date, end_date))
+
+                # Every symbol keeps one row per disjoint range
+                session.execute(delete(PriceCoverage).where(PriceCoverage.symbol.in_(chunk)))
+                records = [
+                    {"symbol": symbol, "start_date": start_date, "end_date": end_date}
+                    for symbol in chunk
+                    for start_date, end_date in merge_ranges(new_ranges[symbol])
+                ]
+                session.execute(insert(PriceCoverage), records)
+
+class EarningsRepository:
+    @staticmethod
+    def save_earnings_dates(earnings_data: Union[List[Dict], pd.DataFrame]):
+        """Batch upsert earnings dates on (symbol, date) (accepts a list of dicts or a DataFrame)"""
+        records = _to_records(earnings_data, EARNINGS_COLUMNS)
+
+        with db_transaction() as session:
+            _upsert(session, EarningsDate, records, ["symbol", "date"], ["eps_estimate", "eps_actual", "surprise"])
             
-            logger.info(f"Saved {len(earnings_data)} earnings records")
+            logger.info(f"Saved {len(records)} earnings records")
 
     @staticmethod
     def get_earnings_in_range(start_date: datetime, end_date: datetime) -> List[Dict]:
@@ -198,32 +395,67 @@ class EarningsRepository:
                 for earning in earnings
             ]
 
+    @staticmethod
+    def get_earnings_with_companies(start_date: datetime, end_date: datetime, min_cap: int = None,
+                                    max_cap: int = None, as_records: bool = False) -> pd.DataFrame:
+        """Get the earnings in a date range joined with their company data, optionally filtered by market cap"""
+        earnings = EarningsDate.__table__
+        companies = Company.__table__
+        columns = EARNINGS_COLUMNS + ["name", "market_cap", "sector"]
+
+        stmt = (
+            select(*[earnings.c[column] for column in EARNINGS_COLUMNS], companies.c.name, companies.c.market_cap,
+                   companies.c.sector)
+            .select_from(earnings.outerjoin(companies, earnings.c.symbol == companies.c.symbol))
+            .where(and_(earnings.c.date >= start_date, earnings.c.date <= end_date))
+            .order_by(earnings.c.date, earnings.c.symbol)
+        )
+        if min_cap is not None:
+            stmt = stmt.where(companies.c.market_cap >= min_cap)
+        if max_cap is not None:
+            stmt = stmt.where(companies.c.market_cap <= max_cap)
+
+        with db_transaction() as session:
+            return _frame_result(_read_frame(session, stmt, columns), as_records)
+
 class NewsRepository:
     @staticmethod
     def save_articles(articles: List[Dict]):
-        """Batch save news articles"""
+        """Batch save news articles, ignoring articles already stored for the same (symbol, url)"""
+        records = _to_records(articles, NEWS_COLUMNS)
+
         with db_transaction() as session:
-            for article in articles:
-                news = NewsArticle(
-                    symbol=article["symbol"],
-                    date=article["date"],
-                    headline=article["headline"],
-                    summary=article.get("summary"),
-                    content=article.get("content"),
-                    source=article.get("source"),
-                    url=article.get("url"),
-                    sentiment_score=article.get("sentiment_score"),
-                    sentiment_reasoning=article.get("sentiment_reasoning")
-                )
-                session.add(news)
+            # Existing rows are kept as they are so that their sentiment is not lost
+            _upsert(session, NewsArticle, records, ["symbol", "url"])
             
-            logger.info(f"Saved {len(articles)} news articles")
+            logger.info(f"Saved {len(records)} news articles")
+
+    @staticmethod
+    def get_content_id_for_url(url: str) -> Optional[int]:
+        """Id of the shared content already downloaded from a normalized URL, None if the URL is new"""
+        with db_transaction() as session:
+            return session.execute(select(ArticleUrl.content_id).where(ArticleUrl.url == url)).scalar()
+
+    @staticmethod
+    def save_article_content(url: str, content: str) -> int:
+        """Store an article text once, keyed by its hash, and link the normalized URL to it, returning the content id"""
+        digest = content_hash(content)
+
+        with db_transaction() as session:
+            # A text already stored under another URL (e.g. a syndicated copy) is reused
+            _upsert(session, ArticleContent, [{"content_hash": digest, "content": content}], ["content_hash"])
+            content_id = session.execute(
+                select(ArticleContent.id).where(ArticleContent.content_hash == digest)
+            ).scalar()
+
+            _upsert(session, ArticleUrl, [{"url": url, "content_id": content_id}], ["url"])
+            return content_id
 
     @staticmethod
     def get_articles_for_symbol_and_period(symbol: str, start_date: datetime, end_date: datetime) -> List[Dict]:
         """Get news articles for symbol in date range"""
         with db_transaction() as session:
-            articles = session.query(NewsArticle).filter(
+            articles = session.query(NewsArticle).options(joinedload(NewsArticle.shared_content)).filter(
                 and_(
                     NewsArticle.symbol == symbol,
                     NewsArticle.date >= start_date,
@@ -238,7 +470,7 @@ class NewsRepository:
                     "date": article.date,
                     "headline": article.headline,
                     "summary": article.summary,
-                    "content": article.content,
+                    "content": _article_content(article),
                     "source": article.source,
                     "url": article.url,
                     "sentiment_score": article.sentiment_score,
@@ -253,6 +485,7 @@ class NewsRepository:
         with db_transaction() as session:
             articles = (
                 session.query(NewsArticle)
+                .options(joinedload(NewsArticle.shared_content))
                 .filter(NewsArticle.date == date)
                 .order_by(NewsArticle.date.desc())
                 .all()
@@ -265,15 +498,83 @@ class NewsRepository:
                     "date": article.date,
                     "headline": article.headline,
                     "summary": article.summary,
-                    "content": article.content,
+                    "content": _article_content(article),
                     "source": article.source,
                     "url": article.url,
                     "sentiment_score": article.sentiment_score,
-                    "sentiment_reasoning": article.sentiment_reasoning
+                    "sentiment_reasoning": article.sentiment_reasoning,
+                    "sentiment_source": article.sentiment_source
                 }
                 for article in articles
             ]
 
+    @staticmethod
+    def get_articles_for_windows(windows: Union[List[Tuple[str, datetime, datetime]], pd.DataFrame],
+                                 include_content: bool = True, as_records: bool = False) -> pd.DataFrame:
+        """Get the articles of many (symbol, start_date, end_date) windows in a few queries.
+
+        Returns one row per (window, article) with the window_id (position of the window
+        in the input), so articles falling in overlapping windows appear once per window.
+        """
+        window_frame = pd.DataFrame(windows, columns=["symbol", "start_date", "end_date"])
+        window_frame["start_date"] = pd.to_datetime(window_frame["start_date"]).dt.date
+        window_frame["end_date"] = pd.to_datetime(window_frame["end_date"]).dt.date
+        window_frame["window_id"] = range(len(window_frame))
+        windows = list(window_frame[["symbol", "start_date", "end_date"]].itertuples(index=False, name=None))
+
+        table = NewsArticle.__table__
+        contents = ArticleContent.__table__
+        columns = ["id"] + [column for column in NEWS_COLUMNS if include_content or column != "content"]
+        selected = [
+            func.coalesce(table.c.content, contents.c.content) if column == "content" else table.c[column]
+            for column in columns
+        ]
+        frames = []
+
+        with db_transaction() as session:
+            for chunk in _chunks(windows, IN_CLAUSE_CHUNK_SIZE // 3):
+                stmt = select(*selected).select_from(
+                    table.outerjoin(contents, table.c.content_id == contents.c.id)
+                ).where(
+                    or_(*[
+                        and_(table.c.symbol == symbol, table.c.date >= start_date, table.c.date <= end_date)
+                        for symbol, start_date, end_date in chunk
+                    ])
+                )
+                frames.append(_read_frame(session, stmt, columns))
+
+        articles = _concat_frames(frames, columns).drop_duplicates(subset="id")
+
+        # Assign every article to all the windows of its symbol that contain its date
+        articles = window_frame.merge(articles, on="symbol")
+        articles = articles[(articles["date"] >= articles["start_date"]) & (articles["date"] <= articles["end_date"])]
+        articles = articles.sort_values(["window_id", "date"], ascending=[True, False], ignore_index=True)
+
+        return _frame_result(articles, as_records)
+
+    @staticmethod
+    def get_daily_sentiment(start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        """Get the sum of sentiment scores and the number of scored articles per symbol and day"""
+        stmt = (
+            select(
+                NewsArticle.symbol,
+                NewsArticle.date,
+                func.sum(NewsArticle.sentiment_score),
+                func.count(NewsArticle.sentiment_score)
+            )
+            .where(
+                and_(
+                    NewsArticle.date >= start_date,
+                    NewsArticle.date <= end_date,
+                    NewsArticle.sentiment_score.is_not(None)
+                )
+            )
+            .group_by(NewsArticle.symbol, NewsArticle.date)
+        )
+
+        with db_transaction() as session:
+            return _read_frame(session, stmt, ["symbol", "date", "sentiment_sum", "articles"])
+
     @staticmethod
     def update_article_sentiment(article_id: int, sentiment_score: float, sentiment_reasoning: str):
         """Update sentiment score for a single article"""
@@ -282,4 +583,87 @@ class NewsRepository:
             if article:
                 article.sentiment_score = sentiment_score
                 article.sentiment_reasoning = sentiment_reasoning
-                logger.debug(f"Updated sentiment for article {article_id}")
\ No newline at end of file
+                logger.debug(f"Updated sentiment for article {article_id}")
+
+    @staticmethod
+    def update_articles_sentiment(updates: List[Dict]):
+        """Bulk update the sentiment of many articles, given as dicts with id, sentiment_score, sentiment_reasoning
+        and optionally sentiment_source.
+
+        Rows are sent with executemany, one transaction per chunk of BULK_CHUNK_SIZE.
+        """
+        table = NewsArticle.__table__
+        stmt = (
+            table.update()
+            .where(table.c.id == bindparam("article_id"))
+            .values(sentiment_score=bindparam("score"), sentiment_reasoning=bindparam("reasoning"),
+                    sentiment_source=bindparam("scorer"))
+        )
+        records = [
+            {"article_id": u["id"], "score": u["sentiment_score"], "reasoning": u["sentiment_reasoning"],
+             "scorer": u.get("sentiment_source")}
+            for u in updates
+        ]
+
+        for chunk in _chunks(records):
+            with db_transaction() as session:
+                session.execute(stmt, chunk)
+
+        logger.debug(f"Updated sentiment for {len(records)} articles")
+
+class SentimentBatchRepository:
+    # Remote statuses after which a batch will never produce results
+    FAILED_STATUSES = ["failed", "expired", "cancelled"]
+
+    @staticmethod
+    def create_batch(input_file: str, output_file: str, articles: Dict[int, Dict]) -> int:
+        """Record a batch input file before it is uploaded, returning the manifest id"""
+        now = datetime.now()
+
+        with db_transaction() as session:
+            batch = SentimentBatch(
+                input_file=input_file,
+                output_file=output_file,
+                articles=json.dumps(articles),
+                status="prepared",
+                created_at=now,
+                updated_at=now
+            )
+            session.add(batch)
+            session.flush()
+            return batch.id
+
+    @staticmethod
+    def update_batch(manifest_id: int, **fields):
+        """Update the given columns of a manifest entry"""
+        with db_transaction() as session:
+            session.execute(
+                update(SentimentBatch)
+                .where(SentimentBatch.id == manifest_id)
+                .values(updated_at=datetime.now(), **fields)
+            )
+
+    @staticmethod
+    def get_open_batches() -> List[Dict]:
+        """Get the batches whose results have not been applied yet and can still produce them"""
+        with db_transaction() as session:
+            batches = session.query(SentimentBatch).filter(
+                and_(
+                    SentimentBatch.applied_at.is_(None),
+                    SentimentBatch.status.not_in(SentimentBatchRepository.FAILED_STATUSES)
+                )
+            ).order_by(SentimentBatch.id).all()
+
+            return [
+                {
+                    "id": batch.id,
+                    "input_file": batch.input_file,
+                    "output_file": batch.output_file,
+                    "articles": {int(article_id): value for article_id, value in json.loads(batch.articles).items()},
+                    "input_file_id": batch.input_file_id,
+                    "batch_id": batch.batch_id,
+                    "output_file_id": batch.output_file_id,
+                    "status": batch.status
+                }
+                for batch in batches
+            ]
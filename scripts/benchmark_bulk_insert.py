@@ -0,0 +1,155 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+# The benchmark runs against a throwaway SQLite file, never against the configured database
+_tmp_dir = tempfile.mkdtemp(prefix="bulk_insert_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}"
+
+from database.connection import engine, db_transaction
+from database.models import Base, StockPrice, EarningsDate
+from database.repositories import StockPriceRepository, EarningsRepository
+from database.price_cache import PriceCache
+
+
+def build_stock_prices(n_symbols, n_days):
+    """Synthetic daily bars for n_symbols over n_days business days"""
+    dates = pd.bdate_range("2020-01-01", periods=n_days).date
+    symbols = [f"S{i:04d}" for i in range(n_symbols)]
+    rng = np.random.default_rng(0)
+    rows = n_symbols * n_days
+
+    return pd.DataFrame({
+        "symbol": np.repeat(symbols, n_days),
+        "date": np.tile(dates, n_symbols),
+        "open": rng.random(rows) * 100,
+        "high": rng.random(rows) * 100,
+        "low": rng.random(rows) * 100,
+        "close": rng.random(rows) * 100,
+        "volume": rng.integers(0, 10_000_000, rows)
+    })
+
+
+def build_earnings(n_rows):
+    """Synthetic earnings rows, with some missing estimates like the scraped calendar"""
+    rng = np.random.default_rng(1)
+    earnings = pd.DataFrame({
+        "symbol": [f"S{i:05d}" for i in range(n_rows)],
+        "date": pd.bdate_range("2020-01-01", periods=n_rows).date,
+        "eps_estimate": rng.random(n_rows),
+        "eps_actual": rng.random(n_rows),
+        "surprise": rng.random(n_rows) * 10
+    })
+    earnings.loc[earnings.index % 7 == 0, "eps_estimate"] = np.nan
+    return earnings
+
+
+def legacy_save_stock_prices(stock_data):
+    """Previous implementation: one ORM object per row"""
+    with db_transaction() as session:
+        for data in stock_data:
+            session.add(StockPrice(**data))
+
+
+def legacy_save_earnings_dates(earnings_data):
+    """Previous implementation: one ORM object per row"""
+    with db_transaction() as session:
+        for data in earnings_data:
+            session.add(EarningsDate(**data))
+
+
+def reset_tables():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+
+def measure(label, rows, func, *args):
+    reset_tables()
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<45} {rows:>9} rows {elapsed:>8.2f} s {rows / elapsed:>12,.0f} rows/s")
+    return elapsed
+
+
+def mapped_array(values):
+    """The memory map a NumPy array is a view on, None if it owns its data"""
+    while values is not None and not isinstance(values, np.memmap):
+        values = values.base if isinstance(values, np.ndarray) else None
+    return values
+
+
+def check_price_cache(symbols):
+    """Time the price cache refresh and loads, and check that the loaded frames are views on the mapped files"""
+    cache = PriceCache(os.path.join(_tmp_dir, "price_cache"))
+
+    start = time.perf_counter()
+    cache.refresh()
+    print(f"{'price cache: refresh':<45} {len(symbols):>9} symbols {time.perf_counter() - start:>5.2f} s")
+
+    # Loading a symbol again maps its files at other addresses, so each column is compared with its own mapping
+    copied = set()
+    start = time.perf_counter()
+    for symbol in symbols:
+        frame = cache.load_frame(symbol)
+        for column in frame.columns:
+            values = frame[column].to_numpy()
+            mapped = mapped_array(values)
+            if mapped is None or not np.shares_memory(values, mapped):
+                copied.add(column)
+    print(f"{'price cache: load_frame':<45} {len(symbols):>9} symbols {time.perf_counter() - start:>5.2f} s")
+
+    if copied:
+        print(f"load_frame copied the columns {', '.join(sorted(copied))} instead of mapping them")
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ORM per-row inserts with the bulk insert path")
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--days", type=int, default=750)
+    parser.add_argument("--earnings", type=int, default=20000)
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary database")
+    args = parser.parse_args()
+
+    try:
+        return run(args)
+    finally:
+        engine.dispose()
+        if args.keep:
+            print(f"Benchmark database kept in {_tmp_dir}")
+        else:
+            shutil.rmtree(_tmp_dir, ignore_errors=True)
+
+
+def run(args):
+    prices = build_stock_prices(args.symbols, args.days)
+    earnings = build_earnings(args.earnings)
+
+    print(f"Database: {os.environ['DATABASE_URL']}")
+
+    legacy = measure("stock_prices: ORM session.add (legacy)", len(prices),
+                     legacy_save_stock_prices, prices.to_dict(orient="records"))
+    bulk = measure("stock_prices: bulk upsert from DataFrame", len(prices),
+                   StockPriceRepository.save_stock_prices, prices)
+    print(f"stock_prices speedup: {legacy / bulk:.1f}x")
+
+    # The cache is built from the prices just inserted
+    if not check_price_cache(prices["symbol"].unique()):
+        return 1
+
+    legacy = measure("earnings_dates: ORM session.add (legacy)", len(earnings),
+                     legacy_save_earnings_dates, earnings.to_dict(orient="records"))
+    bulk = measure("earnings_dates: bulk upsert from DataFrame", len(earnings),
+                   EarningsRepository.save_earnings_dates, earnings)
+    print(f"earnings_dates speedup: {legacy / bulk:.1f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+
+# The benchmark runs against a throwaway SQLite file and cache, never against the configured ones
+_tmp_dir = tempfile.mkdtemp(prefix="sentiment_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}"
+os.environ["CACHE_DIR"] = os.path.join(_tmp_dir, "cache")
+
+from database.migrations import run_migrations
+from database.repositories import CompanyRepository, NewsRepository
+from scripts.serve_fake_openai import build_server
+
+# Words of the synthetic articles, some of them carrying sentiment for the lexicon backend
+VOCABULARY = (
+    "the company said quarter revenue market shares analysts investors guidance outlook product customers "
+    "sales year results demand costs margin management period segment business growth beat raised record "
+    "strong profit missed lawsuit decline weak cut loss concerns risks upgrade downgrade"
+).split()
+
+
+def build_articles(n_articles, n_symbols, n_days, words):
+    """Synthetic articles with distinct texts, spread over n_symbols and n_days"""
+    rng = np.random.default_rng(0)
+    symbols = [f"S{i:04d}" for i in range(n_symbols)]
+    dates = pd.date_range("2024-01-01", periods=n_days).date
+
+    articles = []
+    for i in range(n_articles):
+        symbol = symbols[i % n_symbols]
+        text = " ".join(rng.choice(VOCABULARY, size=words))
+        articles.append({
+            "symbol": symbol,
+            "date": dates[i % n_days],
+            "headline": f"{symbol} update {i}",
+            "summary": f"Synthetic article {i}",
+            "content": f"{symbol} {text}.",
+            "source": "benchmark",
+            "url": f"https://example.com/{symbol}/{i}"
+        })
+
+    companies = [{"symbol": symbol, "name": f"Company {symbol} Inc.", "market_cap": 10 ** 9, "sector": "Benchmark"}
+                 for symbol in symbols]
+    return companies, articles, dates
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time the sentiment submit/poll/apply cycle over synthetic articles against the local fake OpenAI server"
+    )
+    parser.add_argument("--articles", type=int, default=5000)
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--words", type=int, default=300, help="Words per article")
+    parser.add_argument("--backend", default="openai_batch", choices=["openai_batch", "openai_realtime", "auto", "lexicon"])
+    parser.add_argument("--batch-size", type=int, default=2000, help="Maximum requests per batch")
+    parser.add_argument("--completion-seconds", type=float, default=2, help="Time a batch takes to complete")
+    parser.add_argument("--latency", type=float, default=0, help="Seconds added to every API call")
+    parser.add_argument("--error-rate", type=float, default=0, help="Share of API calls answered with a 500")
+    parser.add_argument("--request-failure-rate", type=float, default=0, help="Share of batch requests failing in the output")
+    parser.add_argument("--batch-failure-rate", type=float, default=0, help="Share of batches ending as failed")
+    parser.add_argument("--cleanup", action="store_true", help="Also time OpenAICleanup on the files and batches created")
+    parser.add_argument("--min-requests-per-second", type=float, default=0, help="Exit with an error below this throughput")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary database, cache and batch files")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    working_dir = os.getcwd()
+    try:
+        return run(args)
+    finally:
+        os.chdir(working_dir)
+        if args.keep:
+            print(f"Benchmark files kept in {_tmp_dir}")
+        else:
+            shutil.rmtree(_tmp_dir, ignore_errors=True)
+
+
+def run(args):
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    server = build_server(
+        0, args.completion_seconds, latency=args.latency, error_rate=args.error_rate,
+        request_failure_rate=args.request_failure_rate, batch_failure_rate=args.batch_failure_rate
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    companies, articles, dates = build_articles(args.articles, args.symbols, args.days, args.words)
+    os.environ.update({
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{server.server_address[1]}/v1",
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_MODEL": "benchmark-model",
+        "START_DATE": str(dates[0]),
+        "END_DATE": str(dates[-1]),
+        "DATA_FETCH_PADDING_DAYS": "0",
+        "SENTIMENT_BACKEND": args.backend,
+        "BATCH_MAX_REQUESTS": str(args.batch_size),
+        "BATCH_POLL_MIN_SECONDS": str(max(args.completion_seconds / 20, 0.05)),
+        "BATCH_POLL_MAX_SECONDS": str(max(args.completion_seconds / 2, 0.1))
+    })
+
+    # Batch files are written relative to the working directory
+    os.chdir(_tmp_dir)
+    print(f"Database: {os.environ['DATABASE_URL']}")
+    print(f"Fake API: {os.environ['OPENAI_BASE_URL']}")
+
+    run_migrations()
+    start = time.perf_counter()
+    CompanyRepository.save_companies(companies)
+    NewsRepository.save_articles(articles)
+    print(f"{'setup: save synthetic articles':<35} {time.perf_counter() - start:>8.2f} s")
+
+    # Imported late so that the processor picks up the benchmark settings
+    from data_collection.processors.sentiment_processor import SentimentProcessor
+    from data_collection.processors.openai_cleanup import OpenAICleanup
+
+    processor = SentimentProcessor()
+    start = time.perf_counter()
+    processor.process()
+    total = time.perf_counter() - start
+
+    for stage, seconds in processor.timings.items():
+        print(f"{'stage: ' + stage:<35} {seconds:>8.2f} s")
+
+    scored = sum(
+        1 for date in dates for article in NewsRepository.get_articles_for_date(date)
+        if article["sentiment_score"] is not None
+    )
+    requests_per_second = scored / total if total else 0
+    print(f"{'total (' + args.backend + ')':<35} {total:>8.2f} s")
+    print(f"Scored {scored}/{len(articles)} articles, {requests_per_second:,.0f} requests/s")
+
+    if args.cleanup:
+        start = time.perf_counter()
+        OpenAICleanup().delete()
+        print(f"{'cleanup: OpenAICleanup.delete':<35} {time.perf_counter() - start:>8.2f} s")
+
+    server.shutdown()
+
+    if args.min_requests_per_second and requests_per_second < args.min_requests_per_second:
+        print(f"Throughput below {args.min_requests_per_second:,.0f} requests/s")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
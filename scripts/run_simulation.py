@@ -0,0 +1,32 @@
+import os
+
+# Simulations only query the database: select the read-only SQLite profile before the engine is created on import
+os.environ["SQLITE_PROFILE"] = "read_only"
+
+from utils.logging_utils import setup_logging, get_logger
+from utils.validation_utils import ConfigDataValidator
+from database.price_cache import PriceCache
+from simulation.engine.backtest_engine import BacktestEngine
+
+def main():
+    setup_logging()
+    logger = get_logger(__name__)
+    
+    try:
+        validator = ConfigDataValidator()
+        validator.validate_config()
+
+        # Make sure the columnar prices reflect the database before reading them
+        PriceCache().refresh()
+        
+        engine = BacktestEngine()
+        trades, summary = engine.run()
+
+        logger.info(f"Simulated {summary['trades']} trades, final equity {summary['final_equity']:.2f}")
+        
+    except Exception as e:
+        logger.critical(f"Critical error: {e}")
+        raise
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import os
+import sys
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+def build_handler(fixtures_dir):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        """Serves saved earnings calendar pages: ?day=D&offset=O maps to D_O.html (or D.html for offset 0)"""
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            day = query.get("day", [""])[0]
+            offset = query.get("offset", ["0"])[0]
+
+            candidates = [f"{day}_{offset}.html"]
+            if offset == "0":
+                candidates.append(f"{day}.html")
+
+            for name in candidates:
+                path = os.path.join(fixtures_dir, name)
+                if os.path.isfile(path):
+                    with open(path, "rb") as f:
+                        body = f.read()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+            self.send_error(404, f"No fixture for day={day} offset={offset}")
+
+        def log_message(self, format, *args):
+            pass
+
+    return FixtureHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve saved Yahoo earnings calendar pages, to run EarningsCollector with "
+                    "EARNINGS_CALENDAR_URL=http://127.0.0.1:<port>/calendar/earnings"
+    )
+    parser.add_argument("fixtures_dir")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), build_handler(args.fixtures_dir))
+    print(f"Serving {args.fixtures_dir} on http://127.0.0.1:{args.port}/calendar/earnings")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,361 @@
+import sys
+import json
+import time
+import uuid
+import email
+import random
+import hashlib
+import argparse
+import threading
+from email.policy import HTTP
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class FakeBatchBackend:
+    """In-memory files and batches that progress with time like the OpenAI Batch API.
+
+    A batch is validating for the first 10% of completion_seconds, then in_progress with
+    its completed count growing linearly, and completed once completion_seconds elapsed.
+    The output holds a deterministic sentiment for every request of the input file.
+
+    Failures can be injected: every n-th direct Responses request rejected with a 429
+    (throttle_every), a share of all API calls answered with a 500 (error_rate), of batch
+    requests failing in the output (request_failure_rate) and of batches ending as failed
+    (batch_failure_rate). Every call is delayed by latency seconds.
+    """
+
+    def __init__(self, completion_seconds: float = 5, throttle_every: int = 0, latency: float = 0,
+                 error_rate: float = 0, request_failure_rate: float = 0, batch_failure_rate: float = 0, seed: int = 0):
+        self.completion_seconds = completion_seconds
+        self.throttle_every = throttle_every
+        self.latency = latency
+        self.error_rate = error_rate
+        self.request_failure_rate = request_failure_rate
+        self.batch_failure_rate = batch_failure_rate
+        self.response_requests = 0
+
+        self.files = {}
+        self.batches = {}
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+
+    def create_file(self, filename, content, purpose):
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        with self.lock:
+            self.files[file_id] = {"filename": filename, "content": content, "purpose": purpose, "created_at": int(time.time())}
+        return self.__file_object(file_id)
+
+    def file_content(self, file_id):
+        with self.lock:
+            file = self.files.get(file_id)
+        return file["content"] if file else None
+
+    def create_batch(self, body):
+        batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+        with self.lock:
+            content = self.files[body["input_file_id"]]["content"]
+            self.batches[batch_id] = {
+                "input_file_id": body["input_file_id"],
+                "endpoint": body.get("endpoint"),
+                "completion_window": body.get("completion_window"),
+                "metadata": body.get("metadata"),
+                "total": len(content.splitlines()),
+                "created_at": time.time(),
+                "output_file_id": None,
+                "failed": self.random.random() < self.batch_failure_rate,
+                "cancelled_at": None
+            }
+        return self.retrieve_batch(batch_id)
+
+    def cancel_batch(self, batch_id):
+        with self.lock:
+            batch = self.batches.get(batch_id)
+            if batch is None:
+                return None
+            if batch["cancelled_at"] is None and batch["output_file_id"] is None:
+                batch["cancelled_at"] = time.time()
+        return self.retrieve_batch(batch_id)
+
+    def delete_file(self, file_id):
+        with self.lock:
+            if self.files.pop(file_id, None) is None:
+                return None
+        return {"id": file_id, "object": "file", "deleted": True}
+
+    def list_batches(self):
+        with self.lock:
+            batch_ids = list(self.batches)
+        # retrieve_batch takes the lock itself
+        return self.__list(batch_ids, self.retrieve_batch)
+
+    def list_files(self):
+        with self.lock:
+            return self.__list(list(self.files), self.__file_object)
+
+    def random_error(self):
+        """Whether an API call should fail with a server error"""
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    def retrieve_batch(self, batch_id):
+        with self.lock:
+            batch = self.batches.get(batch_id)
+            if batch is None:
+                return None
+
+            progress = (time.time() - batch["created_at"]) / self.completion_seconds if self.completion_seconds else 1
+            completed = 0
+
+            if batch["cancelled_at"] is not None:
+                status = "cancelled"
+            elif batch["failed"] and progress >= 0.1:
+                status = "failed"
+            elif progress < 0.1:
+                status = "validating"
+            elif progress < 1:
+                status = "in_progress"
+                completed = int(batch["total"] * (progress - 0.1) / 0.9)
+            else:
+                status = "completed"
+                completed = batch["total"]
+                if batch["output_file_id"] is None:
+                    batch["output_file_id"] = self.__write_output(batch)
+
+            return {
+                "id": batch_id,
+                "object": "batch",
+                "endpoint": batch["endpoint"],
+                "input_file_id": batch["input_file_id"],
+                "completion_window": batch["completion_window"],
+                "status": status,
+                "output_file_id": batch["output_file_id"],
+                "error_file_id": None,
+                "created_at": int(batch["created_at"]),
+                "metadata": batch["metadata"],
+                "request_counts": {
+                    "total": batch["total"], "completed": completed - batch.get("failed_requests", 0),
+                    "failed": batch.get("failed_requests", 0)
+                }
+            }
+
+    def throttled(self):
+        with self.lock:
+            self.response_requests += 1
+            return bool(self.throttle_every) and self.response_requests % self.throttle_every == 0
+
+    def __write_output(self, batch):
+        # Called with the lock held
+        lines = []
+        batch["failed_requests"] = 0
+        for line in self.files[batch["input_file_id"]]["content"].splitlines():
+            request = json.loads(line)
+
+            if self.random.random() < self.request_failure_rate:
+                batch["failed_requests"] += 1
+                response = {
+                    "status_code": 500, "request_id": uuid.uuid4().hex,
+                    "body": {"error": {"message": "Synthetic failure", "type": "server_error"}}
+                }
+            else:
+                response = {"status_code": 200, "request_id": uuid.uuid4().hex, "body": fake_response(request["body"])}
+
+            lines.append(json.dumps({
+                "id": f"batch_req_{uuid.uuid4().hex[:24]}",
+                "custom_id": request["custom_id"],
+                "response": response,
+                "error": None
+            }))
+
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        self.files[file_id] = {
+            "filename": "batch_output.jsonl", "content": "\n".join(lines) + "\n",
+            "purpose": "batch_output", "created_at": int(time.time())
+        }
+        return file_id
+
+    def __list(self, ids, to_object):
+        data = [to_object(object_id) for object_id in ids]
+        return {"object": "list", "data": data, "first_id": ids[0] if ids else None,
+                "last_id": ids[-1] if ids else None, "has_more": False}
+
+    def __file_object(self, file_id):
+        file = self.files[file_id]
+        return {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(file["content"].encode("utf-8")),
+            "created_at": file["created_at"],
+            "filename": file["filename"],
+            "purpose": file["purpose"]
+        }
+
+
+def fake_response(body):
+    """Responses API body with a sentiment derived from the hash of the input"""
+    digest = hashlib.sha256(json.dumps(body.get("input"), sort_keys=True).encode("utf-8")).digest()
+    score = round(int.from_bytes(digest[:2], "big") / 65535 * 2 - 1, 2)
+    text = json.dumps({"reasoning_process": "Synthetic sentiment from the local fake server.", "sentiment_score": score})
+
+    return {
+        "id": f"resp_{digest.hex()[:24]}",
+        "object": "response",
+        "status": "completed",
+        "model": body.get("model"),
+        "output": [
+            {"type": "reasoning", "id": f"rs_{digest.hex()[:16]}", "summary": []},
+            {
+                "type": "message", "id": f"msg_{digest.hex()[:16]}", "role": "assistant", "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": []}]
+            }
+        ],
+        "usage": {"input_tokens": len(json.dumps(body.get("input"))) // 4, "output_tokens": 40, "total_tokens": 0}
+    }
+
+
+def build_handler(backend):
+    class FakeOpenAIHandler(BaseHTTPRequestHandler):
+        """The subset of the OpenAI REST API used by SentimentProcessor and OpenAICleanup"""
+
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            path = self.path.split("?")[0].rstrip("/")
+            parts = path.strip("/").split("/")
+
+            if self.__injected_error():
+                return
+
+            if path == "/v1/files":
+                filename, content, purpose = self.__parse_upload(body)
+                return self.__send_json(backend.create_file(filename, content, purpose))
+
+            if path == "/v1/batches":
+                request = json.loads(body)
+                if request.get("input_file_id") not in backend.files:
+                    return self.__send_json({"error": {"message": "No such file"}}, 404)
+                return self.__send_json(backend.create_batch(request))
+
+            if parts[:2] == ["v1", "batches"] and len(parts) == 4 and parts[3] == "cancel":
+                batch = backend.cancel_batch(parts[2])
+                return self.__send_json(batch) if batch else self.__send_json({"error": {"message": "No such batch"}}, 404)
+
+            if path == "/v1/responses":
+                if backend.throttled():
+                    error = {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}
+                    return self.__send_json(error, 429, {"Retry-After": "0.1"})
+                return self.__send_json(fake_response(json.loads(body)))
+
+            self.__send_json({"error": {"message": f"Unknown endpoint {path}"}}, 404)
+
+        def do_GET(self):
+            parts = self.path.split("?")[0].strip("/").split("/")
+
+            if self.__injected_error():
+                return
+
+            if parts == ["v1", "batches"]:
+                return self.__send_json(backend.list_batches())
+
+            if parts == ["v1", "files"]:
+                return self.__send_json(backend.list_files())
+
+            if parts[:2] == ["v1", "batches"] and len(parts) == 3:
+                batch = backend.retrieve_batch(parts[2])
+                return self.__send_json(batch) if batch else self.__send_json({"error": {"message": "No such batch"}}, 404)
+
+            if parts[:2] == ["v1", "files"] and len(parts) == 4 and parts[3] == "content":
+                content = backend.file_content(parts[2])
+                if content is None:
+                    return self.__send_json({"error": {"message": "No such file"}}, 404)
+                return self.__send(content.encode("utf-8"), "application/octet-stream")
+
+            self.__send_json({"error": {"message": f"Unknown endpoint {self.path}"}}, 404)
+
+        def do_DELETE(self):
+            parts = self.path.split("?")[0].strip("/").split("/")
+
+            if self.__injected_error():
+                return
+
+            if parts[:2] == ["v1", "files"] and len(parts) == 3:
+                deleted = backend.delete_file(parts[2])
+                return self.__send_json(deleted) if deleted else self.__send_json({"error": {"message": "No such file"}}, 404)
+
+            self.__send_json({"error": {"message": f"Unknown endpoint {self.path}"}}, 404)
+
+        def __injected_error(self):
+            """Apply the configured latency, and answer with a server error when one is drawn"""
+            if backend.latency:
+                time.sleep(backend.latency)
+
+            if backend.random_error():
+                self.__send_json({"error": {"message": "Synthetic server error", "type": "server_error"}}, 500)
+                return True
+            return False
+
+        def __parse_upload(self, body):
+            message = email.message_from_bytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + body, policy=HTTP
+            )
+            fields = {}
+            for part in message.iter_parts():
+                name = part.get_param("name", header="content-disposition")
+                fields[name] = (part.get_filename(), part.get_payload(decode=True))
+
+            filename, content = fields["file"]
+            return filename, content.decode("utf-8"), fields.get("purpose", (None, b""))[1].decode("utf-8")
+
+        def __send_json(self, payload, status=200, headers=None):
+            self.__send(json.dumps(payload).encode("utf-8"), "application/json", status, headers)
+
+        def __send(self, body, content_type, status=200, headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeOpenAIHandler
+
+
+def build_server(port: int = 8766, completion_seconds: float = 5, throttle_every: int = 0, **failures) -> ThreadingHTTPServer:
+    """Server on localhost, failures being the latency and failure settings of FakeBatchBackend"""
+    backend = FakeBatchBackend(completion_seconds, throttle_every, **failures)
+    return ThreadingHTTPServer(("127.0.0.1", port), build_handler(backend))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve a local stand-in of the OpenAI files, batches and responses endpoints, to run SentimentProcessor "
+                    "and OpenAICleanup offline with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1"
+    )
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--completion-seconds", type=float, default=5, help="Time a batch takes to complete")
+    parser.add_argument("--throttle-every", type=int, default=0, help="Reject every n-th responses request with a 429")
+    parser.add_argument("--latency", type=float, default=0, help="Seconds added to every API call")
+    parser.add_argument("--error-rate", type=float, default=0, help="Share of API calls answered with a 500")
+    parser.add_argument("--request-failure-rate", type=float, default=0, help="Share of batch requests failing in the output")
+    parser.add_argument("--batch-failure-rate", type=float, default=0, help="Share of batches ending as failed")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = build_server(
+        args.port, args.completion_seconds, args.throttle_every, latency=args.latency, error_rate=args.error_rate,
+        request_failure_rate=args.request_failure_rate, batch_failure_rate=args.batch_failure_rate, seed=args.seed
+    )
+    print(f"Serving the fake OpenAI API on http://127.0.0.1:{args.port}/v1")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
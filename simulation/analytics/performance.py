@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+from typing import Dict
+
+
+def summarize_trades(trades: pd.DataFrame, initial_capital: float) -> Dict:
+    """Aggregate statistics of a set of closed trades, with the equity curve built on exit dates"""
+    if trades.empty:
+        return {
+            "trades": 0,
+            "win_rate": 0.0,
+            "total_pnl": 0.0,
+            "total_return": 0.0,
+            "final_equity": float(initial_capital),
+            "max_drawdown": 0.0
+        }
+
+    daily_pnl = trades.groupby("exit_date")["pnl"].sum().sort_index()
+    equity = initial_capital + daily_pnl.cumsum().to_numpy()
+    running_peak = np.maximum.accumulate(np.r_[initial_capital, equity])[1:]
+    drawdown = (equity - running_peak) / running_peak
+
+    total_pnl = float(trades["pnl"].sum())
+
+    return {
+        "trades": int(len(trades)),
+        "win_rate": float((trades["pnl"] > 0).mean()),
+        "total_pnl": total_pnl,
+        "total_return": total_pnl / initial_capital,
+        "final_equity": float(initial_capital + total_pnl),
+        "max_drawdown": float(drawdown.min())
+    }
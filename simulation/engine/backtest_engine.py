@@ -0,0 +1,161 @@
+import os
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Dict, Tuple
+from database.repositories import EarningsRepository, NewsRepository
+from simulation.engine.price_panel import PricePanel
+from simulation.strategies.sentiment_technical_strategy import SentimentTechnicalStrategy
+from simulation.analytics.performance import summarize_trades
+from utils.logging_utils import get_logger
+
+# News published up to this many days before the earnings date feed the sentiment of the event
+SENTIMENT_WINDOW_DAYS = 7
+
+TRADE_COLUMNS = [
+    "symbol", "earnings_date", "entry_date", "exit_date", "score",
+    "entry_price", "exit_price", "shares", "pnl", "return"
+]
+
+
+class BacktestEngine:
+    """Vectorized backtest of the earnings strategy.
+
+    Every earnings event is resolved against the price panel in one batch: the position
+    is opened at the close of the last trading day before the earnings date and closed
+    HOLDING_DAYS trading days later. Events scoring at least MIN_SCORE_THRESHOLD are
+    taken by descending score, with at most MAX_POSITIONS positions open at the same
+    time, each sized to INITIAL_CAPITAL / MAX_POSITIONS.
+    """
+
+    def __init__(self, strategy=None):
+        self.logger = get_logger(__name__)
+
+        self.initial_capital = int(os.getenv("INITIAL_CAPITAL"))
+        self.max_positions = int(os.getenv("MAX_POSITIONS"))
+        self.min_score = float(os.getenv("MIN_SCORE_THRESHOLD"))
+        self.min_market_cap = int(os.getenv("MIN_MARKET_CAP"))
+        self.max_market_cap = int(os.getenv("MAX_MARKET_CAP"))
+        self.holding_days = int(os.getenv("HOLDING_DAYS", 3))
+
+        self.strategy = strategy or SentimentTechnicalStrategy()
+
+    def run(self, start_date=None, end_date=None, events: pd.DataFrame = None,
+            panel: PricePanel = None) -> Tuple[pd.DataFrame, Dict]:
+        """Backtest the earnings events between start_date and end_date (START_DATE/END_DATE by default)"""
+        start_date = start_date or datetime.strptime(os.getenv("START_DATE"), "%Y-%m-%d").date()
+        end_date = end_date or datetime.strptime(os.getenv("END_DATE"), "%Y-%m-%d").date()
+
+        if events is None:
+            events = self.load_events(start_date, end_date)
+        if panel is None:
+            panel = PricePanel.from_cache(events["symbol"].unique())
+
+        self.logger.info(f"Backtesting {len(events)} earnings events over {len(panel)} price bars...")
+
+        trades = self.simulate(events, panel)
+        summary = summarize_trades(trades, self.initial_capital)
+
+        self.logger.info(f"Backtest completed: {summary}")
+        return trades, summary
+
+    def load_events(self, start_date, end_date) -> pd.DataFrame:
+        """Earnings events of the investable universe with the mean sentiment of their news"""
+        events = EarningsRepository.get_earnings_with_companies(
+            start_date, end_date, min_cap=self.min_market_cap, max_cap=self.max_market_cap
+        )
+
+        news = NewsRepository.get_daily_sentiment(start_date - timedelta(days=SENTIMENT_WINDOW_DAYS), end_date)
+
+        # One equi-join per day of the window, matching each event with the news published lag days
+        # before it, instead of joining every event with all the news days of its symbol
+        event_days = events[["symbol", "date"]].assign(day=pd.to_datetime(events["date"]))
+        news_days = news[["symbol", "sentiment_sum", "articles"]].assign(day=pd.to_datetime(news["date"]))
+        window = pd.concat([
+            event_days.merge(news_days.assign(day=news_days["day"] + pd.Timedelta(days=lag)), on=["symbol", "day"])
+            for lag in range(1, SENTIMENT_WINDOW_DAYS + 1)
+        ])
+        sentiment = window.groupby(["symbol", "date"], as_index=False)[["sentiment_sum", "articles"]].sum()
+
+        events = events.merge(sentiment, on=["symbol", "date"], how="left")
+        events["sentiment"] = events["sentiment_sum"] / events["articles"]
+
+        return events.drop(columns=["sentiment_sum"]).reset_index(drop=True)
+
+    def simulate(self, events: pd.DataFrame, panel: PricePanel) -> pd.DataFrame:
+        """Resolve entries, exits, selection and sizing of all the events at once"""
+        if events.empty or len(panel) == 0 or self.max_positions == 0:
+            return pd.DataFrame(columns=TRADE_COLUMNS)
+
+        codes = panel.encode(events["symbol"])
+        days = pd.to_datetime(events["date"]).to_numpy().astype("datetime64[D]").astype(np.int64)
+
+        entry_index = panel.locate_before(codes, days)
+        exit_index = panel.shift(entry_index, self.holding_days)
+        scores = self.strategy.score(events, panel, entry_index)
+
+        candidates = np.flatnonzero((entry_index >= 0) & (exit_index >= 0) & (scores >= self.min_score))
+        if len(candidates) == 0:
+            return pd.DataFrame(columns=TRADE_COLUMNS)
+
+        # Common trading calendar on which positions are opened and released
+        entry_day = panel.days[entry_index[candidates]]
+        exit_day = panel.days[exit_index[candidates]]
+        calendar = np.unique(np.r_[entry_day, exit_day])
+        entry_slot = np.searchsorted(calendar, entry_day)
+        exit_slot = np.searchsorted(calendar, exit_day)
+
+        # By entry day, best score first
+        order = np.lexsort((-scores[candidates], entry_slot))
+        candidates, entry_slot, exit_slot = candidates[order], entry_slot[order], exit_slot[order]
+
+        selected = candidates[self.__select_positions(entry_slot, exit_slot, len(calendar))]
+
+        entry_price = panel.close[entry_index[selected]]
+        exit_price = panel.close[exit_index[selected]]
+        shares = np.floor(self.initial_capital / self.max_positions / entry_price)
+
+        trades = pd.DataFrame({
+            "symbol": events["symbol"].to_numpy()[selected],
+            "earnings_date": events["date"].to_numpy()[selected],
+            "entry_date": panel.days[entry_index[selected]].astype("datetime64[D]"),
+            "exit_date": panel.days[exit_index[selected]].astype("datetime64[D]"),
+            "score": scores[selected],
+            "entry_price": entry_price,
+            "exit_price": exit_price,
+            "shares": shares,
+            "pnl": shares * (exit_price - entry_price),
+            "return": exit_price / entry_price - 1.0
+        })
+
+        # Positions too small to buy a single share are not opened
+        return trades[trades["shares"] > 0].reset_index(drop=True)
+
+    def __select_positions(self, entry_slot, exit_slot, calendar_size):
+        """Mask of the candidates that fit under MAX_POSITIONS concurrent positions.
+
+        Candidates are sorted by entry slot and score, so each day takes a prefix of its
+        candidates; the loop runs once per trading day, never once per event.
+        """
+        accepted = np.zeros(len(entry_slot), dtype=bool)
+        released = np.zeros(calendar_size + 1, dtype=np.int64)
+        day_bounds = np.searchsorted(entry_slot, np.arange(calendar_size + 1))
+
+        open_positions = 0
+        last_day = -1
+
+        for day in np.unique(entry_slot):
+            # Positions exiting at the close of this day free their slot for today's entries
+            open_positions -= released[last_day + 1:day + 1].sum()
+            last_day = day
+
+            first, last = day_bounds[day], day_bounds[day + 1]
+            taken = min(last - first, self.max_positions - open_positions)
+            if taken <= 0:
+                continue
+
+            accepted[first:first + taken] = True
+            np.add.at(released, exit_slot[first:first + taken], 1)
+            open_positions += taken
+
+        return accepted
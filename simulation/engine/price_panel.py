@@ -0,0 +1,106 @@
+import numpy as np
+from typing import List
+from database.price_cache import PriceCache
+
+# Multiplier separating symbols in the (symbol, day) search keys, larger than any day number
+KEY_STRIDE = 1 << 20
+
+
+class PricePanel:
+    """All the price series of a universe concatenated into flat arrays, sorted by symbol and date.
+
+    Bars are addressed by their position in the flat arrays; a bar of symbol code c on day d
+    has the search key c * KEY_STRIDE + d, so whole batches of (symbol, date) lookups are a
+    single searchsorted call.
+    """
+
+    def __init__(self, symbols: List[str], codes, days, open_prices, close_prices):
+        self.symbols = list(symbols)
+        self.symbol_codes = {symbol: code for code, symbol in enumerate(self.symbols)}
+
+        self.codes = codes
+        self.days = days
+        self.open = open_prices
+        self.close = close_prices
+        self.keys = codes.astype(np.int64) * KEY_STRIDE + days
+
+        # Index of the first bar of the symbol of every bar
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        self.series_start = np.repeat(starts, np.diff(np.r_[starts, len(codes)]))
+
+    @classmethod
+    def from_cache(cls, symbols: List[str] = None, cache: PriceCache = None):
+        """Build the panel from the memory-mapped price cache, skipping symbols without prices"""
+        cache = cache or PriceCache()
+        symbols = sorted(set(symbols)) if symbols is not None else cache.symbols()
+
+        loaded_symbols, codes, days, open_prices, close_prices = [], [], [], [], []
+        for symbol in symbols:
+            arrays = cache.load(symbol)
+            if arrays is None or len(arrays["date"]) == 0:
+                continue
+
+            code = len(loaded_symbols)
+            loaded_symbols.append(symbol)
+            codes.append(np.full(len(arrays["date"]), code, dtype=np.int32))
+            days.append(arrays["date"].astype("datetime64[D]").astype(np.int64))
+            open_prices.append(arrays["open"])
+            close_prices.append(arrays["close"])
+
+        if not loaded_symbols:
+            empty = np.empty(0)
+            return cls([], empty.astype(np.int32), empty.astype(np.int64), empty, empty)
+
+        return cls(
+            loaded_symbols,
+            np.concatenate(codes),
+            np.concatenate(days),
+            np.concatenate(open_prices),
+            np.concatenate(close_prices)
+        )
+
+    def encode(self, symbols) -> np.ndarray:
+        """Symbol codes of the given symbols, -1 for symbols not in the panel"""
+        return np.array([self.symbol_codes.get(symbol, -1) for symbol in symbols], dtype=np.int64)
+
+    def locate_before(self, codes: np.ndarray, days: np.ndarray) -> np.ndarray:
+        """Index of the last bar strictly before each (code, day), -1 if there is none"""
+        positions = np.searchsorted(self.keys, codes * KEY_STRIDE + days, side="left") - 1
+
+        valid = (codes >= 0) & (positions >= 0)
+        valid[valid] &= self.codes[positions[valid]] == codes[valid]
+        return np.where(valid, positions, -1)
+
+    def shift(self, positions: np.ndarray, bars: int) -> np.ndarray:
+        """Index of the bar that comes bars trading days later in the same series, -1 if out of range"""
+        shifted = positions + bars
+
+        valid = (positions >= 0) & (shifted < len(self.codes))
+        valid[valid] &= self.codes[shifted[valid]] == self.codes[positions[valid]]
+        return np.where(valid, shifted, -1)
+
+    def rsi(self, period: int) -> np.ndarray:
+        """Simple-average RSI of every bar over the previous period closes, NaN where history is too short"""
+        delta = np.diff(self.close, prepend=np.nan)
+        delta[self.series_start == np.arange(len(delta))] = 0.0
+
+        gains = np.concatenate([[0.0], np.cumsum(np.clip(delta, 0, None))])
+        losses = np.concatenate([[0.0], np.cumsum(np.clip(-delta, 0, None))])
+
+        index = np.arange(len(delta))
+        window_start = index - period + 1
+        valid = window_start > self.series_start
+        window_start = np.clip(window_start, 0, None)
+
+        average_gain = (gains[index + 1] - gains[window_start]) / period
+        average_loss = (losses[index + 1] - losses[window_start]) / period
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100.0 - 100.0 / (1.0 + average_gain / average_loss)
+
+        # Flat windows are neutral, windows without losses are fully overbought
+        rsi = np.where(average_loss == 0, np.where(average_gain == 0, 50.0, 100.0), rsi)
+        return np.where(valid, rsi, np.nan)
+
+    def __len__(self):
+        return len(self.codes)
@@ -0,0 +1,33 @@
+import os
+import numpy as np
+import pandas as pd
+from simulation.engine.price_panel import PricePanel
+
+
+class SentimentTechnicalStrategy:
+    """Scores earnings events by mixing news sentiment and RSI at the entry bar.
+
+    The sentiment component is the mean sentiment_score of the news collected before the
+    event, in [-1, 1]. The technical component maps RSI to [-1, 1], positive when the stock
+    is oversold. Both are weighted with SENTIMENT_WEIGHT and TECHNICAL_WEIGHT.
+    """
+
+    def __init__(self):
+        self.sentiment_weight = float(os.getenv("SENTIMENT_WEIGHT"))
+        self.technical_weight = float(os.getenv("TECHNICAL_WEIGHT"))
+        self.rsi_period = int(os.getenv("RSI_PERIOD"))
+
+    def score(self, events: pd.DataFrame, panel: PricePanel, entry_index: np.ndarray) -> np.ndarray:
+        """Score of every event, NaN for events without an entry bar"""
+        sentiment = np.nan_to_num(events["sentiment"].to_numpy(dtype=float), nan=0.0)
+
+        rsi = panel.rsi(self.rsi_period)
+        has_entry = entry_index >= 0
+        entry_rsi = np.full(len(events), np.nan)
+        entry_rsi[has_entry] = rsi[entry_index[has_entry]]
+
+        # Without enough history the technical component is neutral
+        technical = np.nan_to_num((50.0 - entry_rsi) / 50.0, nan=0.0)
+
+        scores = self.sentiment_weight * sentiment + self.technical_weight * technical
+        return np.where(has_entry, scores, np.nan)
@@ -0,0 +1,94 @@
+import re
+import hashlib
+from typing import Iterable
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Rough ratio used to estimate the tokens of a text without a tokenizer
+CHARS_PER_TOKEN = 4
+
+# Share of the token budget always given to the opening sentences of a truncated article
+LEAD_BUDGET_SHARE = 0.25
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+COMPANY_SUFFIXES = re.compile(
+    r"[,\s]+(inc|incorporated|corp|corporation|co|company|ltd|limited|plc|holdings|group|n\.v|s\.a|ag|se)\.?$",
+    re.IGNORECASE
+)
+
+# Query parameters that only track where a link was clicked, not which page it points to
+TRACKING_PARAMETERS = {"guccounter", "guce_referrer", "guce_referrer_sig", "soc_src", "soc_trk", "tsrc", "ncid", ".tsrc"}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of an article URL, so that the same page is recognized behind different links"""
+    parts = urlsplit(url.strip())
+
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMETERS and not key.lower().startswith("utm_")
+    ]
+
+    return urlunsplit(("https", host, parts.path.rstrip("/") or "/", urlencode(sorted(query)), ""))
+
+
+def content_hash(content: str) -> str:
+    """SHA-256 of the article text, ignoring differences in whitespace and case"""
+    normalized = " ".join(content.split()).lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def company_terms(symbol: str, company: str = None) -> list:
+    """Strings whose presence marks a sentence as being about the company"""
+    terms = [symbol]
+    if company:
+        name = company
+        # "Apple Inc." -> "Apple", "Foo Holdings Corp" -> "Foo"
+        while COMPANY_SUFFIXES.search(name):
+            name = COMPANY_SUFFIXES.sub("", name)
+        terms.extend({company, name} - {""})
+    return terms
+
+
+def truncate_article(content: str, max_tokens: int, terms: Iterable[str]) -> str:
+    """Shorten an article to about max_tokens, keeping its lead and the sentences that mention the terms.
+
+    Kept sentences stay in their original order. Articles within the budget are returned unchanged.
+    """
+    if estimate_tokens(content) <= max_tokens:
+        return content
+
+    sentences = SENTENCE_SPLIT.split(content)
+    budget = max_tokens * CHARS_PER_TOKEN
+    patterns = [re.compile(rf"\b{re.escape(term)}\b", re.IGNORECASE) for term in terms if term]
+
+    kept = set()
+    used = 0
+
+    def keep(indexes):
+        nonlocal used
+        for i in indexes:
+            if i not in kept and used + len(sentences[i]) + 1 <= budget:
+                kept.add(i)
+                used += len(sentences[i]) + 1
+
+    # The opening sentences, then the ones about the company, then whatever still fits
+    for i in range(len(sentences)):
+        if used + len(sentences[i]) + 1 > budget * LEAD_BUDGET_SHARE:
+            break
+        keep([i])
+    keep([i for i, sentence in enumerate(sentences) if any(p.search(sentence) for p in patterns)])
+    keep(range(len(sentences)))
+
+    # Text without sentence breaks is simply cut
+    if not kept:
+        return content[:budget]
+
+    return " ".join(sentences[i] for i in sorted(kept))
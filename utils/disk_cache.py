@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Optional
+
+# Reads whose access times are kept in memory before being written in a single commit
+ACCESS_FLUSH_SIZE = 1000
+
+
+class DiskCache:
+    """Persistent key-value cache stored as zlib-compressed blobs in a standalone SQLite file.
+
+    Keys are hashed, so any string can be used. Entries older than ttl seconds are
+    treated as missing. When max_bytes is set, the least recently read entries are
+    evicted as soon as the compressed values exceed it. Access times are buffered and
+    written with the next write, every ACCESS_FLUSH_SIZE reads or on close, so that
+    reads do not commit. Use it as a context manager to close it when done.
+    """
+
+    def __init__(self, path: str, ttl: float = None, max_bytes: int = None):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed_at ON entries (accessed_at)")
+        self._conn.commit()
+
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+        self._accessed = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        digest = self.__digest(key)
+
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (digest,)).fetchone()
+
+            if row is None or (self.ttl is not None and time.time() - row[1] > self.ttl):
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._accessed[digest] = time.time()
+            if len(self._accessed) >= ACCESS_FLUSH_SIZE:
+                self.__flush_accesses()
+                self._conn.commit()
+
+        return zlib.decompress(row[0])
+
+    def set(self, key: str, value: bytes):
+        self.set_many({key: value})
+
+    def set_many(self, items: Dict[str, bytes]):
+        """Store many entries with a single commit"""
+        now = time.time()
+        rows = [(self.__digest(key), zlib.compress(value)) for key, value in items.items()]
+
+        with self._lock:
+            # Eviction below needs the latest access times
+            self.__flush_accesses()
+
+            for digest, compressed in rows:
+                previous = self._conn.execute("SELECT size FROM entries WHERE key = ?", (digest,)).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (digest, compressed, len(compressed), now, now)
+                )
+                self._bytes += len(compressed) - (previous[0] if previous else 0)
+
+            if self.max_bytes is not None and self._bytes > self.max_bytes:
+                self.__evict()
+
+            self._conn.commit()
+
+    def get_json(self, key: str):
+        value = self.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set_json(self, key: str, value):
+        self.set(key, json.dumps(value).encode("utf-8"))
+
+    def set_many_json(self, items: Dict):
+        self.set_many({key: json.dumps(value).encode("utf-8") for key, value in items.items()})
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": entries, "bytes": size}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self.__flush_accesses()
+            self._conn.commit()
+            self._conn.close()
+
+    def __flush_accesses(self):
+        # Called with the lock held, the caller commits
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, digest) for digest, accessed_at in self._accessed.items()]
+            )
+            self._accessed = {}
+
+    def __evict(self):
+        # Drop least recently used entries down to 90% of max_bytes, so that eviction does not run on every write
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall()
+
+        evicted = []
+        for key, size in rows:
+            if self._bytes <= target:
+                break
+            evicted.append((key,))
+            self._bytes -= size
+
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        self.evictions += len(evicted)
+
+    def __digest(self, key):
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
@@ -0,0 +1,111 @@
+import os
+import time
+import asyncio
+import threading
+from typing import Dict
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Limiter key used for every request made through the yfinance library
+YFINANCE_HOST = "query2.finance.yahoo.com"
+
+
+class RateLimiter:
+    """Token bucket shared by threads and asyncio tasks.
+
+    Each caller reserves its token under a lock, letting the balance go negative when
+    the bucket is empty, and then sleeps outside the lock until its token is due.
+    Reservations are served in arrival order, so waiting callers are queued fairly.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int = 1):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.acquisitions = 0
+        self.delayed_acquisitions = 0
+        self.total_wait = 0.0
+
+    def acquire(self, tokens: int = 1) -> float:
+        """Block the calling thread until tokens are available, returning the time waited"""
+        delay = self.__reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self, tokens: int = 1) -> float:
+        """Suspend the calling task until tokens are available, returning the time waited"""
+        delay = self.__reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "acquisitions": self.acquisitions,
+                "delayed_acquisitions": self.delayed_acquisitions,
+                "total_wait": self.total_wait
+            }
+
+    def __reserve(self, tokens):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+
+            self._tokens -= tokens
+            delay = max(0.0, -self._tokens / self.rate)
+
+            self.acquisitions += 1
+            if delay > 0:
+                self.delayed_acquisitions += 1
+                self.total_wait += delay
+
+            return delay
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _default_limits(host):
+    if host == YFINANCE_HOST:
+        return float(os.getenv("YFINANCE_RATE", 2)), int(os.getenv("YFINANCE_BURST", 5))
+
+    # Scraped hosts default to one request every SCRAPING_DELAY seconds
+    rate = os.getenv("SCRAPING_RATE")
+    rate = float(rate) if rate else 1 / float(os.getenv("SCRAPING_DELAY"))
+    return rate, int(os.getenv("SCRAPING_BURST", 1))
+
+
+def get_rate_limiter(host_or_url: str) -> RateLimiter:
+    """Process-wide limiter of a host (a full URL can be passed as well)"""
+    host = urlparse(host_or_url).netloc or host_or_url
+
+    with _limiters_lock:
+        if host not in _limiters:
+            rate, burst = _default_limits(host)
+            _limiters[host] = RateLimiter(host, rate, burst)
+        return _limiters[host]
+
+
+def log_rate_limiter_stats(logger):
+    """Log how many requests every limiter delayed and for how long"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+
+    for limiter in limiters:
+        stats = limiter.stats()
+        logger.info(
+            f"Rate limiter {stats['name']}: {stats['acquisitions']} requests, "
+            f"{stats['delayed_acquisitions']} delayed, {stats['total_wait']:.1f}s spent waiting"
+        )
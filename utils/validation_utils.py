@@ -49,6 +49,14 @@ class ConfigDataValidator:
             self.logger.critical(f"Invalid SCRAPING_DELAY: {scraping_delay}")
             raise ValueError("Scraping delay must be greater than zero")
         self.logger.debug("SCRAPING_DELAY validated")
+
+        # Scraping rate limiter validation
+        scraping_rate = float(os.getenv("SCRAPING_RATE") or 1 / scraping_delay)
+        scraping_burst = int(os.getenv("SCRAPING_BURST", 1))
+        if scraping_rate <= 0 or scraping_burst <= 0:
+            self.logger.critical(f"Invalid rate limit: SCRAPING_RATE={scraping_rate}, SCRAPING_BURST={scraping_burst}")
+            raise ValueError("Scraping rate and burst must be greater than zero")
+        self.logger.debug("SCRAPING_RATE and SCRAPING_BURST validated")
         
 		# Scraping delay validation
         data_fetch_padding_days = int(os.getenv("DATA_FETCH_PADDING_DAYS"))
@@ -57,6 +65,107 @@ class ConfigDataValidator:
             raise ValueError("Data fetch padding days must be greater than or equal to zero")
         self.logger.debug("DATA_FETCH_PADDING_DAYS validated")
 
+        # Earnings scraping workers validation
+        earnings_workers = int(os.getenv("EARNINGS_SCRAPING_WORKERS", 1))
+        if earnings_workers <= 0:
+            self.logger.critical(f"Invalid EARNINGS_SCRAPING_WORKERS: {earnings_workers}")
+            raise ValueError("Earnings scraping workers must be greater than zero")
+        self.logger.debug("EARNINGS_SCRAPING_WORKERS validated")
+
+        # Company collection validation
+        company_workers = int(os.getenv("COMPANY_WORKERS", 4))
+        company_refresh_days = int(os.getenv("COMPANY_REFRESH_DAYS", 30))
+        if company_workers <= 0 or company_refresh_days < 0:
+            self.logger.critical(f"Invalid company settings: COMPANY_WORKERS={company_workers}, COMPANY_REFRESH_DAYS={company_refresh_days}")
+            raise ValueError("Company workers must be greater than zero and refresh days must not be negative")
+        self.logger.debug("COMPANY_WORKERS and COMPANY_REFRESH_DAYS validated")
+
+        # Stock download batch size validation
+        stock_batch_size = int(os.getenv("STOCK_BATCH_SIZE", 50))
+        if stock_batch_size <= 0:
+            self.logger.critical(f"Invalid STOCK_BATCH_SIZE: {stock_batch_size}")
+            raise ValueError("Stock batch size must be greater than zero")
+        self.logger.debug("STOCK_BATCH_SIZE validated")
+
+        # Incremental stock collection validation
+        gap_merge_days = int(os.getenv("STOCK_GAP_MERGE_DAYS", 10))
+        max_holiday_gap = int(os.getenv("STOCK_MAX_HOLIDAY_GAP", 3))
+        if gap_merge_days < 0 or max_holiday_gap < 0:
+            self.logger.critical(f"Invalid gap settings: STOCK_GAP_MERGE_DAYS={gap_merge_days}, STOCK_MAX_HOLIDAY_GAP={max_holiday_gap}")
+            raise ValueError("Stock gap settings must not be negative")
+        self.logger.debug("STOCK_GAP_MERGE_DAYS and STOCK_MAX_HOLIDAY_GAP validated")
+
+        # Holding days validation
+        holding_days = int(os.getenv("HOLDING_DAYS", 3))
+        if holding_days <= 0:
+            self.logger.critical(f"Invalid HOLDING_DAYS: {holding_days}")
+            raise ValueError("Holding days must be greater than zero")
+        self.logger.debug("HOLDING_DAYS validated")
+
+        # Article cache size validation
+        article_cache_max_mb = float(os.getenv("ARTICLE_CACHE_MAX_MB", 512))
+        if article_cache_max_mb <= 0:
+            self.logger.critical(f"Invalid ARTICLE_CACHE_MAX_MB: {article_cache_max_mb}")
+            raise ValueError("Article cache size must be greater than zero")
+        self.logger.debug("ARTICLE_CACHE_MAX_MB validated")
+
+        # Batch limits validation
+        batch_max_requests = int(os.getenv("BATCH_MAX_REQUESTS", 50000))
+        batch_max_mb = float(os.getenv("BATCH_MAX_MB", 190))
+        batch_max_tokens = int(os.getenv("BATCH_MAX_TOKENS", 20000000))
+        if batch_max_requests <= 0 or batch_max_mb <= 0 or batch_max_tokens <= 0:
+            self.logger.critical(
+                f"Invalid batch limits: BATCH_MAX_REQUESTS={batch_max_requests}, "
+                f"BATCH_MAX_MB={batch_max_mb}, BATCH_MAX_TOKENS={batch_max_tokens}"
+            )
+            raise ValueError("Batch limits must be greater than zero")
+        self.logger.debug("BATCH_MAX_REQUESTS, BATCH_MAX_MB and BATCH_MAX_TOKENS validated")
+
+        # Batch polling validation
+        poll_min = float(os.getenv("BATCH_POLL_MIN_SECONDS", 10))
+        poll_max = float(os.getenv("BATCH_POLL_MAX_SECONDS", 300))
+        if poll_min <= 0 or poll_min > poll_max:
+            self.logger.critical(f"Invalid polling intervals: BATCH_POLL_MIN_SECONDS={poll_min}, BATCH_POLL_MAX_SECONDS={poll_max}")
+            raise ValueError("Polling intervals must be positive, with the minimum not above the maximum")
+        self.logger.debug("BATCH_POLL_MIN_SECONDS and BATCH_POLL_MAX_SECONDS validated")
+
+        # Sentiment backend validation
+        sentiment_backend = os.getenv("SENTIMENT_BACKEND", "openai_batch")
+        sentiment_workers = int(os.getenv("SENTIMENT_WORKERS", os.cpu_count() or 1))
+        if sentiment_backend not in {"openai_batch", "openai_realtime", "auto", "lexicon"} or sentiment_workers <= 0:
+            self.logger.critical(f"Invalid sentiment settings: SENTIMENT_BACKEND={sentiment_backend}, SENTIMENT_WORKERS={sentiment_workers}")
+            raise ValueError(
+                "Sentiment backend must be one of openai_batch, openai_realtime, auto, lexicon and workers must be greater than zero"
+            )
+        self.logger.debug("SENTIMENT_BACKEND and SENTIMENT_WORKERS validated")
+
+        # Realtime sentiment validation
+        realtime_concurrency = int(os.getenv("SENTIMENT_REALTIME_CONCURRENCY", 16))
+        realtime_retries = int(os.getenv("SENTIMENT_REALTIME_MAX_RETRIES", 5))
+        realtime_budget = int(os.getenv("SENTIMENT_REALTIME_TOKEN_BUDGET", 0))
+        realtime_output_tokens = int(os.getenv("SENTIMENT_REALTIME_OUTPUT_TOKENS", 1024))
+        realtime_max_articles = int(os.getenv("SENTIMENT_REALTIME_MAX_ARTICLES", 500))
+        deadline_hours = float(os.getenv("SENTIMENT_DEADLINE_HOURS") or 1)
+        if realtime_concurrency <= 0 or realtime_output_tokens <= 0 or min(realtime_retries, realtime_budget, realtime_max_articles) < 0 or deadline_hours <= 0:
+            self.logger.critical(
+                f"Invalid realtime settings: SENTIMENT_REALTIME_CONCURRENCY={realtime_concurrency}, "
+                f"SENTIMENT_REALTIME_MAX_RETRIES={realtime_retries}, SENTIMENT_REALTIME_TOKEN_BUDGET={realtime_budget}, "
+                f"SENTIMENT_REALTIME_OUTPUT_TOKENS={realtime_output_tokens}, "
+                f"SENTIMENT_REALTIME_MAX_ARTICLES={realtime_max_articles}, SENTIMENT_DEADLINE_HOURS={os.getenv('SENTIMENT_DEADLINE_HOURS')}"
+            )
+            raise ValueError(
+                "Realtime concurrency, output tokens and deadline must be greater than zero, "
+                "retries, budget and article limit must not be negative"
+            )
+        self.logger.debug("Realtime sentiment settings validated")
+
+        # Article token budget validation
+        max_article_tokens = int(os.getenv("SENTIMENT_MAX_ARTICLE_TOKENS", 1500))
+        if max_article_tokens <= 0:
+            self.logger.critical(f"Invalid SENTIMENT_MAX_ARTICLE_TOKENS: {max_article_tokens}")
+            raise ValueError("Article token budget must be greater than zero")
+        self.logger.debug("SENTIMENT_MAX_ARTICLE_TOKENS validated")
+
         # Weights validation
         sentiment_weight = float(os.getenv("SENTIMENT_WEIGHT"))
         technical_weight = float(os.getenv("TECHNICAL_WEIGHT"))
@@ -81,6 +190,13 @@ class ConfigDataValidator:
             raise ValueError("Minimum market cap must be less than the maximum market cap")
         self.logger.debug("MIN_MARKET_CAP and MAX_MARKET_CAP validated")
 
+        # SQLite profile validation
+        sqlite_profile = os.getenv("SQLITE_PROFILE", "ingest")
+        if sqlite_profile not in {"default", "ingest", "read_only"}:
+            self.logger.critical(f"Invalid SQLITE_PROFILE: {sqlite_profile}")
+            raise ValueError("SQLite profile must be one of default, ingest, read_only")
+        self.logger.debug("SQLITE_PROFILE validated")
+
         # Log level validation
         log_level = os.getenv("LOG_LEVEL")
         if log_level not in {"DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"}: